@@ -1,77 +1,173 @@
 # contents of file
 import streamlit as st
-import pandas as pd
-import numpy as np
-from datetime import datetime
-import calendar
+from datetime import date, datetime, timedelta
 import math
 
+# Cold start loads only Streamlit and these light modules; pandas / NumPy and the
+# planning and report modules are imported inside the pages that use them.
+from context import (
+    ALL_AREAS, CF_AREAS, CONTEXT_KEYS, DIVISIONS, REGISTRY_KEYS, WD_AREAS, load_context, plant_db_path, plant_names,
+)
+from precompute import SnapshotWorker, describe_age
+from profiler import Profiler
+from store import ProductionStore
+
 # --- CONFIGURATION & STATE INITIALIZATION ---
 st.set_page_config(page_title="VOLTAS CR Plant", layout="wide")
 
+# Each plant is its own partition (store file with its records, plans and models)
+PLANTS = plant_names()
+# Session keys holding the selected plant's data: pending entries and widgets built from its
+# registries (a stale Settings checkbox or BOM grid would be saved into the next plant)
+PLANT_SESSION_PREFIXES = ("temp_entries_", "act_", "bom_editor", "audit_month", "model_", "crf_model_", "crf_cat_")
+plant = PLANTS[0] if len(PLANTS) == 1 else st.sidebar.selectbox("Plant", PLANTS, key="plant")
+if st.session_state.get("context_plant") != plant:
+    # settings, pending entries and widget values in the session belong to the previous plant
+    for key in list(st.session_state.keys()):
+        if key in CONTEXT_KEYS or str(key).startswith(PLANT_SESSION_PREFIXES):
+            del st.session_state[key]
+    st.session_state.plan_grid_rev = st.session_state.get("plan_grid_rev", 0) + 1
+    st.session_state.context_plant = plant
+
 # Header
 st.title("VOLTAS CR Plant")
-st.markdown("<h4 style='font-size: 14px; margin-top: -15px;'>Waghodia</h4>", unsafe_allow_html=True)
+st.markdown(f"<h4 style='font-size: 14px; margin-top: -15px;'>{plant}</h4>", unsafe_allow_html=True)
 st.markdown("---")
 
+# --- PRODUCTION STORE ---
+# Submitted production records live in a shared SQLite file per plant (not per-session state)
+@st.cache_resource
+def get_store(plant):
+    return ProductionStore(plant_db_path(plant))
+
+# Last CF chain schedule per month, so re-planning only re-solves models that drifted
+@st.cache_resource
+def get_line_schedules(plant):
+    return {}
+
+# Seconds the first snapshot build waits (unless a commit comes first), so a cold start renders before reports load
+SNAPSHOT_START_DELAY = 10
+
+# Today's standard reports, rebuilt in a background thread after commits and on a timer.
+# The worker also holds the typed production frame (re-parses only rows added since the
+# last sync) and the day x area x model rollup cube that every session's reports read.
+@st.cache_resource
+def get_snapshot_worker(plant):
+    return SnapshotWorker(get_store(plant)).start(delay=SNAPSHOT_START_DELAY)
+
+# Today's Actual per hour, area and model for the andon board, advanced by record id on each poll
+@st.cache_resource
+def get_hourly_buckets(plant):
+    from buckets import HourlyBuckets
+    return HourlyBuckets(since=(date.today() - timedelta(days=1)).isoformat())
+
+def refresh_rollups():
+    production, cube = snapshots.rollups()
+    with profiler.section("frame sync") as timing:
+        before = len(production.df)
+        production.sync(store)
+        timing.rows = len(production.df) - before
+    with profiler.section("rollup sync", rows=timing.rows):
+        cube.sync(production)
+    return production, cube
+
+store = get_store(plant)
+snapshots = get_snapshot_worker(plant)
+
+# Opt-in timing of the script's hot sections for this session (Settings → Diagnostics)
+if 'profiler' not in st.session_state:
+    st.session_state.profiler = Profiler()
+profiler = st.session_state.profiler
+
+# Large report tables are shown (and styled) one page at a time
+PAGE_SIZE = 50
+
+def precomputed(key, date_str):
+    """(found, report) from the latest background snapshot; notes its age when found."""
+    served = snapshots.get(key, date_str)
+    if served is None:
+        return False, None
+    report, snapshot = served
+    note = f"Precomputed {describe_age(snapshot.age)} ago"
+    if not snapshots.is_current(snapshot):
+        note += " · newer data is being processed in the background; rerun to see it"
+    st.caption(note)
+    return True, report
+
+def paginate(df, key, page_size=PAGE_SIZE):
+    if len(df) <= page_size:
+        return df
+    pages = math.ceil(len(df) / page_size)
+    page = st.number_input(f"Page (1-{pages})", min_value=1, max_value=pages, value=1, key=key)
+    start = (page - 1) * page_size
+    st.caption(f"Rows {start + 1}-{min(start + page_size, len(df))} of {len(df)}")
+    return df.iloc[start:start + page_size]
+
 # --- SESSION STATE INITIALIZATION ---
-if 'production_data' not in st.session_state:
-    st.session_state.production_data = []
-
-# Two main product categories (top-level)
-if 'categories' not in st.session_state:
-    st.session_state.categories = ["Chest Freezer", "Water Dispenser"]
-
-# Models for Chest Freezer assembly flow (used in Pre-assembly, Cabinet Foaming, Door Foaming, CF Final Line)
-if 'cf_models' not in st.session_state:
-    st.session_state.cf_models = ["CF-Model-100", "CF-Model-200"]
-
-# Models for Water Dispenser (independent)
-if 'wd_models' not in st.session_state:
-    st.session_state.wd_models = ["WD-Model-A", "WD-Model-B"]
-
-# CRF (parts) are separate — they produce parts required by CF assembly. CRF has its own models/categories.
-if 'crf_models' not in st.session_state:
-    st.session_state.crf_models = ["CRF-Part-A", "CRF-Part-B"]
-if 'crf_categories' not in st.session_state:
-    st.session_state.crf_categories = ["CRF Parts"]
-
-# activation flags for models (works across all model sets)
-if 'active_models' not in st.session_state:
-    st.session_state.active_models = {}
-    for m in st.session_state.crf_models + st.session_state.cf_models + st.session_state.wd_models:
-        st.session_state.active_models[m] = True
-
-# plan_data default storage (backwards-compatible)
-if 'plan_data' not in st.session_state:
-    st.session_state.plan_data = {}
-    # Initialize for all known models
-    for m in st.session_state.crf_models + st.session_state.cf_models + st.session_state.wd_models:
-        st.session_state.plan_data.setdefault(m, {'monthly': 0, 'daily': 0})
-
-# monthly/daily plans keyed by YYYY-MM and YYYY-MM-DD
-if 'monthly_plans' not in st.session_state:
-    st.session_state.monthly_plans = {}
-if 'daily_plans' not in st.session_state:
-    st.session_state.daily_plans = {}
-
-# CF Area configuration (explicit)
-CF_AREAS = ["CRF", "Pre-Assembly", "Cabinet Foaming", "Door Foaming", "CF Final Line"]
-WD_AREAS = ["WD Final Line"]
-ALL_AREAS = CF_AREAS + WD_AREAS
+# Model registries and plans are saved in the store (shared with the CLI and other
+# sessions); each session starts from the saved values, defaults when never saved.
+# Only the registries are read up front; plans and the rest load with the first page that uses them.
+def use_context(*keys):
+    missing = [key for key in keys if key not in st.session_state]
+    if missing:
+        saved = load_context(store, missing)
+        for key in missing:
+            st.session_state[key] = saved[key]
+
+use_context(*REGISTRY_KEYS)
+
+def save_settings(*keys):
+    store.save_config({key: st.session_state[key] for key in keys})
+    snapshots.notify()
+
+def save_plan_changes(key, changes, plan_data_field=None):
+    """Write plan grid changes ({period: {model: qty or None}}) into the stored plans, not this
+    session's copy, so cells other planners saved meanwhile are kept; returns cells written.
+
+    plan_data_field ('monthly' / 'daily') also updates the legacy per-model targets.
+    """
+    from context import default_context
+    from plans import apply_changes
+    written = []
+
+    def update_plans(plans):
+        plans = default_context()[key] if plans is None else plans
+        written.append(apply_changes(plans, changes))
+        return plans
+
+    def update_plan_data(plan_data):
+        plan_data = default_context()['plan_data'] if plan_data is None else plan_data
+        for cells in changes.values():
+            for model, qty in cells.items():
+                if qty is not None:
+                    plan_data.setdefault(model, {'monthly': 0, 'daily': 0})[plan_data_field] = qty
+        return plan_data
+
+    updates = {key: update_plans}
+    if plan_data_field is not None:
+        updates['plan_data'] = update_plan_data
+    st.session_state.update(store.update_config(updates))
+    snapshots.notify()
+    return written[0]
 
 # --- NAVIGATION ---
 menu = st.radio("Select Module:", 
-    ["1. Plan Entry", "2. Production Entry", "3. Plan Vs Actual Report", "4. Settings"], 
+    ["1. Plan Entry", "2. Production Entry", "3. Plan Vs Actual Report", "4. Settings", "5. Andon Board"], 
     horizontal=True)
 st.markdown("---")
+profiler.start_run(menu)
 
 # --- SETTINGS ---
 if menu == "4. Settings":
+    import pandas as pd
+    from archive import CLOSE_AFTER_DAYS, archive_dir, archive_summary, closed_months, compact_closed, rehydrate, restore_month
+    from bom import bom_entries, bom_frame
+    from plans import WEEKDAY_NAMES, working_days
+    use_context(*CONTEXT_KEYS)
     st.header("⚙️ Settings")
     st.info("Manage categories and models. CRF (parts) has its own categories/models. CF assembly uses cf_models. WD uses wd_models.")
 
-    tab_cat, tab_model, tab_crf = st.tabs(["Manage Top Categories", "Manage Models (CF/WD)", "Manage CRF Models/Categories"])
+    tab_cat, tab_model, tab_crf, tab_bom, tab_calendar, tab_rollup, tab_diag = st.tabs(["Manage Top Categories", "Manage Models (CF/WD)", "Manage CRF Models/Categories", "Bill of Materials", "Plant Calendar", "Rollup Maintenance", "Diagnostics"])
 
     with tab_cat:
         st.subheader("Top-level Product Categories")
@@ -80,6 +176,7 @@ if menu == "4. Settings":
         if st.button("Add Top Category"):
             if new_cat and new_cat not in st.session_state.categories:
                 st.session_state.categories.append(new_cat)
+                save_settings('categories')
                 st.success(f"Added top category: {new_cat}")
             elif new_cat:
                 st.warning("Category already exists")
@@ -96,6 +193,7 @@ if menu == "4. Settings":
                             st.session_state.cf_models.append(new_model)
                             st.session_state.active_models[new_model] = True
                             st.session_state.plan_data[new_model] = {'monthly': 0, 'daily': 0}
+                            save_settings('cf_models', 'active_models', 'plan_data')
                             st.success(f"Added CF model {new_model}")
                         else:
                             st.warning("Model exists")
@@ -104,6 +202,7 @@ if menu == "4. Settings":
                             st.session_state.wd_models.append(new_model)
                             st.session_state.active_models[new_model] = True
                             st.session_state.plan_data[new_model] = {'monthly': 0, 'daily': 0}
+                            save_settings('wd_models', 'active_models', 'plan_data')
                             st.success(f"Added WD model {new_model}")
                         else:
                             st.warning("Model exists")
@@ -111,7 +210,9 @@ if menu == "4. Settings":
             st.subheader("Activate/Deactivate Models (all)")
             for model in sorted(set(st.session_state.crf_models + st.session_state.cf_models + st.session_state.wd_models)):
                 is_active = st.checkbox(model, value=st.session_state.active_models.get(model, True), key=f"act_{model}")
-                st.session_state.active_models[model] = is_active
+                if st.session_state.active_models.get(model, True) != is_active:
+                    st.session_state.active_models[model] = is_active
+                    save_settings('active_models')
 
     with tab_crf:
         st.subheader("Manage CRF (Parts) Models & Categories")
@@ -120,6 +221,7 @@ if menu == "4. Settings":
         if st.button("Add CRF Category"):
             if new_crf_cat and new_crf_cat not in st.session_state.crf_categories:
                 st.session_state.crf_categories.append(new_crf_cat)
+                save_settings('crf_categories')
                 st.success(f"Added CRF category {new_crf_cat}")
             elif new_crf_cat:
                 st.warning("CRF category exists")
@@ -131,141 +233,358 @@ if menu == "4. Settings":
                 st.session_state.crf_models.append(new_crf_model)
                 st.session_state.active_models[new_crf_model] = True
                 st.session_state.plan_data[new_crf_model] = {'monthly': 0, 'daily': 0}
+                save_settings('crf_models', 'active_models', 'plan_data')
                 st.success(f"Added CRF model {new_crf_model}")
             elif new_crf_model:
                 st.warning("CRF model exists")
 
+    with tab_bom:
+        st.subheader("CRF Parts per CF Model")
+        st.caption("Quantity of each CRF part one CF model unit consumes. Add rows at the bottom of the grid or paste from a spreadsheet.")
+        with st.form("bom_form"):
+            bom_table = st.data_editor(
+                bom_frame(st.session_state.bom), num_rows="dynamic", hide_index=True, key="bom_editor",
+                column_config={
+                    "CF Model": st.column_config.SelectboxColumn("CF Model", options=st.session_state.cf_models, required=True),
+                    "CRF Part": st.column_config.SelectboxColumn("CRF Part", options=st.session_state.crf_models, required=True),
+                    "Qty per Unit": st.column_config.NumberColumn("Qty per Unit", min_value=0.0, step=1.0),
+                },
+            )
+            if st.form_submit_button("Save Bill of Materials"):
+                entries, problems = bom_entries(bom_table)
+                for problem in problems:
+                    st.warning(f"Skipped {problem}")
+                st.session_state.bom = entries
+                save_settings('bom')
+                st.success(f"Bill of materials saved ({len(entries)} lines)")
+
+    with tab_calendar:
+        st.subheader("Working Days for Plan Phasing")
+        st.caption("Days without a daily plan get the monthly plan spread over working days (WIP Plan (Day) / Plan (Period)).")
+        plant_calendar = st.session_state.plant_calendar
+        with st.form("plant_calendar_form"):
+            weekly_off = st.multiselect("Weekly off days", WEEKDAY_NAMES, default=[WEEKDAY_NAMES[d] for d in plant_calendar["weekly_off"]])
+            holidays_text = st.text_area("Holidays (one YYYY-MM-DD per line)", "\n".join(plant_calendar["holidays"]))
+            if st.form_submit_button("Save Calendar"):
+                holidays = set()
+                bad = []
+                for line in holidays_text.splitlines():
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        holidays.add(date.fromisoformat(line).isoformat())
+                    except ValueError:
+                        bad.append(line)
+                if bad:
+                    st.error(f"Not a YYYY-MM-DD date: {', '.join(bad)}")
+                else:
+                    st.session_state.plant_calendar = {
+                        "weekly_off": sorted(WEEKDAY_NAMES.index(d) for d in weekly_off),
+                        "holidays": sorted(holidays),
+                    }
+                    save_settings('plant_calendar')
+                    st.success("Plant calendar saved")
+        this_month = datetime.now().strftime("%Y-%m")
+        st.write(f"Working days in {this_month}: {int(working_days(this_month, st.session_state.plant_calendar).sum())}")
+
+    with tab_rollup:
+        st.subheader("Day x Area x Model Rollup")
+        production, cube = refresh_rollups()
+        st.write(f"Raw records: {len(production.df)} | Archived cells: {len(production.archived)} | "
+                 f"Rollup days: {len(cube.days())} | Synced to record #{cube.last_id}")
+        st.caption(f"Typed frame memory: {production.memory_usage() / 1e6:.1f} MB")
+        snapshot = snapshots.snapshot
+        if snapshot is None:
+            st.caption("Report snapshots: first build in progress")
+        else:
+            st.caption(f"Report snapshots: {snapshot.date}, built {describe_age(snapshot.age)} ago "
+                       f"in {snapshot.build_seconds * 1000:.0f} ms (store version {snapshot.version})")
+        if snapshots.error is not None:
+            st.error(f"Last snapshot rebuild failed: {snapshots.error}")
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("Verify Rollup Against Raw History"):
+                mismatches = cube.verify(production)
+                if mismatches.empty:
+                    st.success("Rollup matches raw history.")
+                else:
+                    st.error(f"{len(mismatches)} rollup cells differ from raw history.")
+                    st.dataframe(mismatches, hide_index=True)
+        with col2:
+            if st.button("Rebuild Rollup From Raw History"):
+                cube.rebuild(production)
+                snapshots.rebuild(force=True)
+                st.success("Rollup rebuilt.")
+
+        st.subheader("Closed Month Archive")
+        st.caption(f"Months ended more than {CLOSE_AFTER_DAYS} days ago can be compacted: reports read their "
+                   f"day x area x model totals from Parquet summaries and the raw records move to {archive_dir(store)}.")
+        today = datetime.now().strftime("%Y-%m-%d")
+        closed = closed_months(store, today)
+        if st.button(f"Compact Closed Months ({', '.join(closed) or 'none'})", disabled=not closed):
+            with st.spinner("Compacting..."):
+                moved = compact_closed(store, today)
+            # the shared frame still holds the moved rows; reload it from the live months
+            snapshots.reset()
+            st.success(f"Archived {sum(moved.values())} records from {', '.join(moved)}.")
+        archived = archive_summary(store)
+        if archived.empty:
+            st.info("No months archived yet.")
+        else:
+            st.dataframe(archived.round(1), hide_index=True)
+            audit_month = st.selectbox("Archived month", list(archived["Month"]), key="audit_month")
+            col1, col2 = st.columns(2)
+            with col1:
+                if st.button("Rehydrate Raw Records"):
+                    raw = rehydrate(store, audit_month)
+                    st.download_button(f"Download {audit_month} Records (CSV)", raw.to_csv(index=False),
+                                       file_name=f"production_{audit_month}.csv", mime="text/csv")
+                    st.dataframe(raw.head(PAGE_SIZE), hide_index=True)
+            with col2:
+                if st.button("Restore Month to Live Records"):
+                    restored = restore_month(store, audit_month)
+                    snapshots.reset()
+                    st.success(f"Restored {restored} records of {audit_month}.")
+
+    with tab_diag:
+        st.subheader("Rerun Profiler")
+        recording = st.checkbox("Record section timings (wall time, rows, process-wide peak memory)", value=profiler.enabled, key="profiler_enabled")
+        if recording and not profiler.enabled:
+            profiler.enable()
+        elif not recording and profiler.enabled:
+            profiler.disable()
+        st.caption("Memory tracing adds overhead while recording is on. Timings are kept for this session only; "
+                   "peak memory is the whole process's, so other sessions recording at the same time are included.")
+
+        summary = profiler.summary()
+        if summary.empty:
+            st.info("No timings recorded yet. Enable recording, then use the entry forms and reports.")
+        else:
+            st.markdown("#### Sections")
+            st.dataframe(summary.round(1), hide_index=True)
+            st.markdown("#### Recent Reruns")
+            st.dataframe(profiler.recent_runs().round(1), hide_index=True)
+
+        col1, col2 = st.columns(2)
+        with col1:
+            meta = {
+                "exported": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "plant": plant,
+                "database": plant_db_path(plant),
+                "records": len(snapshots.rollups()[0].df),
+                "streamlit": st.__version__,
+                "pandas": pd.__version__,
+            }
+            st.download_button("Export History (JSON)", profiler.export_json(meta),
+                               file_name=f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json", mime="application/json")
+        with col2:
+            if st.button("Clear History"):
+                profiler.clear()
+                st.rerun()
+
 # --- PLAN ENTRY ---
 elif menu == "1. Plan Entry":
     st.header("🗓️ Production Plan Entry (password protected)")
     password = st.text_input("Enter Plan Password", type="password")
     if password == "admin":
+        import pandas as pd
+        from plans import grid_changes, month_days, plan_grid
+        from scheduler import CHAIN_AREAS, chain_models, chain_state, schedule_chain, schedule_summary
+        use_context(*CONTEXT_KEYS)
         st.success("Access Granted")
-        tab_monthly, tab_daily = st.tabs(["Monthly Plan", "Daily Plan"])
+        tab_monthly, tab_daily, tab_schedule = st.tabs(["Monthly Plan", "Daily Plan", "CF Line Schedule"])
 
         active_models_list = [m for m in st.session_state.cf_models + st.session_state.wd_models + st.session_state.crf_models if st.session_state.active_models.get(m, True)]
 
+        # One grid per period instead of a widget per model; saving writes only the edited cells.
+        # Editor keys carry a revision so a saved grid reloads from the stored plans.
+        if 'plan_grid_rev' not in st.session_state:
+            st.session_state.plan_grid_rev = 0
+        rev = st.session_state.plan_grid_rev
+
         with tab_monthly:
-            st.subheader("Set Monthly Production Targets (per model)")
+            st.subheader("Set Monthly Production Targets (models x months)")
+            plan_year = int(st.number_input("Year", min_value=2000, max_value=2100, value=datetime.now().year, step=1, key="monthly_plan_year"))
+            months = [f"{plan_year:04d}-{m:02d}" for m in range(1, 13)]
+            monthly_before = plan_grid(st.session_state.monthly_plans, active_models_list, months,
+                                       fallback=lambda m: st.session_state.plan_data.get(m, {}).get('monthly', 0))
+            st.caption("Edit cells or paste a block copied from a spreadsheet, then save.")
             with st.form("monthly_plan_form"):
-                month_sel = st.date_input("Select Month", datetime.now().date(), key="monthly_plan_month_picker")
-                month_str = month_sel.strftime("%Y-%m")
-                monthly_entries = {}
-                for model in active_models_list:
-                    default = st.session_state.monthly_plans.get(month_str, {}).get(model, st.session_state.plan_data.get(model, {}).get('monthly', 0))
-                    monthly_entries[model] = st.number_input(f"Monthly Target for {model}", min_value=0, value=int(default), key=f"mon_{model}")
+                monthly_after = st.data_editor(
+                    monthly_before, key=f"monthly_grid_{plan_year}_{rev}",
+                    column_config={m: st.column_config.NumberColumn(datetime.strptime(m, "%Y-%m").strftime("%b"), min_value=0, step=1, format="%d") for m in months},
+                )
                 if st.form_submit_button("Save Monthly Plan"):
-                    for model, qty in monthly_entries.items():
-                        st.session_state.monthly_plans.setdefault(month_str, {})[model] = int(qty)
-                        st.session_state.plan_data.setdefault(model, {'monthly': 0, 'daily': 0})['monthly'] = int(qty)
-                    st.success(f"Monthly plan saved for {month_str}")
+                    changes = grid_changes(monthly_before, monthly_after)
+                    if changes:
+                        # legacy plan_data keeps the last saved monthly target per model
+                        written = save_plan_changes('monthly_plans', changes, plan_data_field='monthly')
+                        st.session_state.plan_grid_rev += 1
+                        st.success(f"Monthly plan saved: {written} cell(s) in {', '.join(sorted(changes))}")
+                    else:
+                        st.info("No changes to save")
 
         with tab_daily:
-            st.subheader("Set Daily Production Targets (per model)")
+            st.subheader("Set Daily Production Targets (models x days)")
+            plan_month = st.date_input("Select Month (pick any date in month)", datetime.now().date(), key="daily_plan_month_picker").strftime("%Y-%m")
+            days = month_days(plan_month)
+            daily_before = plan_grid(st.session_state.daily_plans, active_models_list, days)
+            st.caption("Empty cells have no daily plan; reports then phase the monthly plan over working days. Clear a cell to remove its daily plan.")
             with st.form("daily_plan_form"):
-                date_sel = st.date_input("Select Date", datetime.now().date(), key="daily_plan_date_picker")
-                date_str = date_sel.strftime("%Y-%m-%d")
-                daily_entries = {}
-                for model in active_models_list:
-                    default = st.session_state.daily_plans.get(date_str, {}).get(model, st.session_state.plan_data.get(model, {}).get('daily', 0))
-                    daily_entries[model] = st.number_input(f"Daily Target for {model}", min_value=0, value=int(default), key=f"day_{model}")
+                daily_after = st.data_editor(
+                    daily_before, key=f"daily_grid_{plan_month}_{rev}",
+                    column_config={d: st.column_config.NumberColumn(d[-2:], min_value=0, step=1, format="%d") for d in days},
+                )
                 if st.form_submit_button("Save Daily Plan"):
-                    for model, qty in daily_entries.items():
-                        st.session_state.daily_plans.setdefault(date_str, {})[model] = int(qty)
-                        st.session_state.plan_data.setdefault(model, {'monthly': 0, 'daily': 0})['daily'] = int(qty)
-                    st.success(f"Daily plan saved for {date_str}")
+                    changes = grid_changes(daily_before, daily_after)
+                    if changes:
+                        written = save_plan_changes('daily_plans', changes, plan_data_field='daily')
+                        st.session_state.plan_grid_rev += 1
+                        st.success(f"Daily plan saved: {written} cell(s) on {len(changes)} day(s)")
+                    else:
+                        st.info("No changes to save")
+
+        with tab_schedule:
+            st.subheader("Schedule the CF Chain into Daily Plans")
+            st.caption("Spreads each CF model's monthly target over working days across Pre-Assembly → CF Final Line, "
+                       "within each stage's daily capacity and the WIP buffer (0 = unlimited). "
+                       "The CF Final Line schedule is written to the Daily Plan; models without a monthly target keep theirs.")
+            with st.form("line_capacity_form"):
+                cap_cols = st.columns(len(CHAIN_AREAS) + 1)
+                line_capacity = {}
+                for col, area in zip(cap_cols, CHAIN_AREAS):
+                    line_capacity[area] = int(col.number_input(f"{area} (units/day)", min_value=0, value=int(st.session_state.line_capacity.get(area, 0)), step=10))
+                wip_buffer = int(cap_cols[-1].number_input("WIP buffer (units)", min_value=0, value=int(st.session_state.wip_buffer), step=10))
+                if st.form_submit_button("Save Capacities"):
+                    st.session_state.line_capacity = line_capacity
+                    st.session_state.wip_buffer = wip_buffer
+                    save_settings('line_capacity', 'wip_buffer')
+                    st.success("Line capacities saved")
+
+            today = datetime.now().date()
+            schedule_month = st.date_input("Month to schedule (pick any date in month)", today, key="schedule_month_picker").strftime("%Y-%m")
+            actuals_through = st.date_input("Actuals counted through", today - timedelta(days=1), key="schedule_through")
+            if st.button("Schedule and Fill Daily Plans", type="primary"):
+                month_days_list = month_days(schedule_month)
+                through = actuals_through.strftime("%Y-%m-%d")
+                # days already produced keep their plan; only the rest of the month is re-planned
+                through = None if through < month_days_list[0] else min(through, month_days_list[-1])
+                _production, cube = refresh_rollups()
+                models = chain_models(st.session_state)
+                schedules = get_line_schedules(plant)
+                with profiler.section("line schedule", rows=len(models)):
+                    done, wip = chain_state(cube, models, schedule_month, through)
+                    schedule = schedule_chain(st.session_state, schedule_month, done=done, wip=wip, through=through,
+                                              previous=schedules.get(schedule_month))
+                schedules[schedule_month] = schedule
+                # diff against the stored daily plans, which other planners may have changed since this session loaded them
+                st.session_state.daily_plans = load_context(store, ['daily_plans'])['daily_plans']
+                changes = schedule.final_line_changes(st.session_state.daily_plans)
+                written = save_plan_changes('daily_plans', changes) if changes else 0
+                if written:
+                    st.session_state.plan_grid_rev += 1
+                st.success(f"Re-planned {schedule.resolved} of {len(models)} model(s); {written} daily plan cell(s) updated.")
+                st.dataframe(pd.DataFrame(schedule_summary(schedule, done)), hide_index=True)
+                shortfall = schedule.shortfall(done)
+                if shortfall.any():
+                    short = pd.DataFrame({"Model": models, "Short of Target": shortfall})
+                    st.warning(f"Capacity cannot meet {int(shortfall.sum())} unit(s) of this month's CF targets.")
+                    st.dataframe(short[short["Short of Target"] > 0], hide_index=True)
     elif password:
         st.error("Incorrect Password")
 
 # --- PRODUCTION ENTRY ---
 elif menu == "2. Production Entry":
     st.header("📝 Production Data Entry")
-    product_type = st.radio("Select Product Line:", ["❄️ Chest Freezer", "💧 Water Dispenser"], horizontal=True)
+    product_type = st.radio("Select Product Line:", ["❄️ Chest Freezer", "💧 Water Dispenser", "📥 Bulk Import"], horizontal=True)
     st.markdown("---")
 
-    if product_type == "❄️ Chest Freezer":
-        st.subheader("Chest Freezer Line Entry")
-        area_tabs = st.tabs(CF_AREAS)
-        for i, area in enumerate(CF_AREAS):
-            with area_tabs[i]:
-                st.markdown(f"#### {area} Production Log")
-                with st.form(f"form_{area}"):
-                    supervisor_name = st.text_input("Supervisor Name (Required)", key=f"sup_{area}")
-                    if f'temp_entries_{area}' not in st.session_state:
-                        st.session_state[f'temp_entries_{area}'] = []
-                    st.markdown("---")
-
-                    # CRF is special: allow selecting CRF category & CRF model (parts)
-                    if area == "CRF":
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            crf_cat = st.selectbox("CRF Category", st.session_state.crf_categories, key=f"crf_cat_{area}")
-                        with col2:
-                            crf_available_models = [m for m in st.session_state.crf_models if st.session_state.active_models.get(m, True)]
-                            crf_model = st.selectbox("CRF Model (Part)", crf_available_models, key=f"crf_model_{area}")
-                        production_qty = st.number_input("Production Entry Field", min_value=1, value=1, key=f"qty_{area}")
-                        if st.form_submit_button("Add to List"):
-                            if supervisor_name and crf_model:
-                                entry = {
-                                    "Supervisor": supervisor_name,
-                                    "Category": crf_cat,
-                                    "Model": crf_model,
-                                    "Quantity": production_qty
-                                }
-                                st.session_state[f'temp_entries_{area}'].append(entry)
-                                st.success(f"Added {production_qty} units of {crf_model} to list.")
-                            else:
-                                st.error("Provide Supervisor and select CRF model.")
+    # Each area form is a fragment: "Add to List" / "SUBMIT ALL ENTRIES" rerun only that form
+    @st.fragment
+    def cf_area_entry(area):
+        st.markdown(f"#### {area} Production Log")
+        with st.form(f"form_{area}"):
+            supervisor_name = st.text_input("Supervisor Name (Required)", key=f"sup_{area}")
+            if f'temp_entries_{area}' not in st.session_state:
+                st.session_state[f'temp_entries_{area}'] = []
+            st.markdown("---")
+
+            # CRF is special: allow selecting CRF category & CRF model (parts)
+            if area == "CRF":
+                col1, col2 = st.columns(2)
+                with col1:
+                    crf_cat = st.selectbox("CRF Category", st.session_state.crf_categories, key=f"crf_cat_{area}")
+                with col2:
+                    crf_available_models = [m for m in st.session_state.crf_models if st.session_state.active_models.get(m, True)]
+                    crf_model = st.selectbox("CRF Model (Part)", crf_available_models, key=f"crf_model_{area}")
+                production_qty = st.number_input("Production Entry Field", min_value=1, value=1, key=f"qty_{area}")
+                if st.form_submit_button("Add to List"):
+                    if supervisor_name and crf_model:
+                        entry = {
+                            "Supervisor": supervisor_name,
+                            "Category": crf_cat,
+                            "Model": crf_model,
+                            "Quantity": production_qty
+                        }
+                        st.session_state[f'temp_entries_{area}'].append(entry)
+                        st.success(f"Added {production_qty} units of {crf_model} to list.")
                     else:
-                        # Assembly areas: single CF assembly line category ("Chest Freezer") and CF models
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            st.write("**Category:** Chest Freezer (Assembly)")
-                        with col2:
-                            cf_available_models = [m for m in st.session_state.cf_models if st.session_state.active_models.get(m, True)]
-                            model = st.selectbox("Model", cf_available_models, key=f"model_{area}")
-                        production_qty = st.number_input("Production Entry Field", min_value=1, value=1, key=f"qty_{area}")
-                        if st.form_submit_button("Add to List"):
-                            if supervisor_name and model:
-                                entry = {
-                                    "Supervisor": supervisor_name,
-                                    "Category": "Chest Freezer",
-                                    "Model": model,
-                                    "Quantity": production_qty
-                                }
-                                st.session_state[f'temp_entries_{area}'].append(entry)
-                                st.success(f"Added {production_qty} units of {model} to list.")
-                            else:
-                                st.error("Provide Supervisor and select a model.")
-
-                    st.markdown("---")
-                    if st.session_state[f'temp_entries_{area}']:
-                        st.markdown("**Pending Submissions:**")
-                        st.dataframe(pd.DataFrame(st.session_state[f'temp_entries_{area}']), hide_index=True)
-                        if st.form_submit_button("SUBMIT ALL ENTRIES", type="primary"):
-                            if st.session_state[f'temp_entries_{area}']:
-                                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M")
-                                for e in st.session_state[f'temp_entries_{area}']:
-                                    # For CRF entries we set Product = "CRF_PARTS", for assembly CF product mark "CF"
-                                    product_tag = "CRF_PARTS" if area == "CRF" else "CF"
-                                    st.session_state.production_data.append({
-                                        "Date": timestamp,
-                                        "Area": area,
-                                        "Supervisor": e['Supervisor'],
-                                        "Category": e['Category'],
-                                        "Model": e['Model'],
-                                        "Actual": e['Quantity'],
-                                        "Product": product_tag
-                                    })
-                                st.session_state[f'temp_entries_{area}'] = []
-                                st.success(f"✅ All {area} entries submitted!")
+                        st.error("Provide Supervisor and select CRF model.")
+            else:
+                # Assembly areas: single CF assembly line category ("Chest Freezer") and CF models
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.write("**Category:** Chest Freezer (Assembly)")
+                with col2:
+                    cf_available_models = [m for m in st.session_state.cf_models if st.session_state.active_models.get(m, True)]
+                    model = st.selectbox("Model", cf_available_models, key=f"model_{area}")
+                production_qty = st.number_input("Production Entry Field", min_value=1, value=1, key=f"qty_{area}")
+                if st.form_submit_button("Add to List"):
+                    if supervisor_name and model:
+                        entry = {
+                            "Supervisor": supervisor_name,
+                            "Category": "Chest Freezer",
+                            "Model": model,
+                            "Quantity": production_qty
+                        }
+                        st.session_state[f'temp_entries_{area}'].append(entry)
+                        st.success(f"Added {production_qty} units of {model} to list.")
                     else:
-                        st.warning("Add entries then submit.")
+                        st.error("Provide Supervisor and select a model.")
 
-    else:
-        # Water Dispenser flow
-        st.subheader("Water Dispenser Line Entry")
-        area = WD_AREAS[0]
+            st.markdown("---")
+            if st.session_state[f'temp_entries_{area}']:
+                st.markdown("**Pending Submissions:**")
+                st.dataframe(st.session_state[f'temp_entries_{area}'], hide_index=True)
+                if st.form_submit_button("SUBMIT ALL ENTRIES", type="primary"):
+                    if st.session_state[f'temp_entries_{area}']:
+                        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M")
+                        batch = []
+                        for e in st.session_state[f'temp_entries_{area}']:
+                            # For CRF entries we set Product = "CRF_PARTS", for assembly CF product mark "CF"
+                            product_tag = "CRF_PARTS" if area == "CRF" else "CF"
+                            batch.append({
+                                "Date": timestamp,
+                                "Area": area,
+                                "Supervisor": e['Supervisor'],
+                                "Category": e['Category'],
+                                "Model": e['Model'],
+                                "Actual": e['Quantity'],
+                                "Product": product_tag
+                            })
+                        # queued to the store's single writer; returns once the batch is committed
+                        with profiler.section("submit batch", rows=len(batch)):
+                            store.append(batch)
+                        # the snapshot worker brings the shared rollups up to date in the background
+                        snapshots.notify()
+                        st.session_state[f'temp_entries_{area}'] = []
+                        st.success(f"✅ All {area} entries submitted!")
+            else:
+                st.warning("Add entries then submit.")
+
+    @st.fragment
+    def wd_area_entry(area):
         st.markdown(f"#### {area} Production Log")
         with st.form(f"form_{area}"):
             supervisor_name = st.text_input("Supervisor Name (Required)", key=f"sup_{area}")
@@ -289,11 +608,12 @@ elif menu == "2. Production Entry":
                     st.error("Provide Supervisor and select a model.")
             st.markdown("---")
             if st.session_state[f'temp_entries_{area}']:
-                st.dataframe(pd.DataFrame(st.session_state[f'temp_entries_{area}']), hide_index=True)
+                st.dataframe(st.session_state[f'temp_entries_{area}'], hide_index=True)
                 if st.form_submit_button("SUBMIT ALL ENTRIES", type="primary"):
                     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M")
+                    batch = []
                     for e in st.session_state[f'temp_entries_{area}']:
-                        st.session_state.production_data.append({
+                        batch.append({
                             "Date": timestamp,
                             "Area": area,
                             "Supervisor": e['Supervisor'],
@@ -302,114 +622,110 @@ elif menu == "2. Production Entry":
                             "Actual": e['Quantity'],
                             "Product": "WD"
                         })
+                    # queued to the store's single writer; returns once the batch is committed
+                    with profiler.section("submit batch", rows=len(batch)):
+                        store.append(batch)
+                    snapshots.notify()
                     st.session_state[f'temp_entries_{area}'] = []
                     st.success("✅ All entries submitted!")
 
+    if product_type == "❄️ Chest Freezer":
+        st.subheader("Chest Freezer Line Entry")
+        # only the selected area's form is built
+        area = st.radio("Select Area:", CF_AREAS, horizontal=True, key="cf_entry_area")
+        cf_area_entry(area)
+    elif product_type == "💧 Water Dispenser":
+        # Water Dispenser flow
+        st.subheader("Water Dispenser Line Entry")
+        wd_area_entry(WD_AREAS[0])
+    else:
+        # Bulk import of line PLC/MES exports
+        st.subheader("Bulk Import Production Log (CSV / Excel)")
+        st.info("Columns: Date, Area, Model, Quantity (or Actual), optional Supervisor, Category, Product (CRF/CF/WD), Seq (record id). "
+                "Rows repeating an existing (timestamp, Area, Model, Supervisor, Quantity, Seq) are skipped as duplicates.")
+        import pandas as pd
+        from importer import AreaRule, import_production_log
+        upload = st.file_uploader("Production log file", type=["csv", "xlsx"], key="bulk_import_file")
+        import_supervisor = st.text_input("Supervisor for rows without one", key="bulk_import_supervisor")
+        if upload is not None and st.button("Import File", type="primary"):
+            crf_cats = st.session_state.crf_categories
+            rules = {"CRF": AreaRule(st.session_state.crf_models, "CRF_PARTS", crf_cats[0] if crf_cats else None, crf_cats)}
+            for cf_area in CF_AREAS[1:]:
+                rules[cf_area] = AreaRule(st.session_state.cf_models, "CF", "Chest Freezer")
+            for wd_area in WD_AREAS:
+                rules[wd_area] = AreaRule(st.session_state.wd_models, "WD", "Water Dispenser")
+
+            bar = st.progress(0.0, text="Importing...")
+            def on_progress(done, stats):
+                bar.progress(done, text=f"Read {stats['read']} rows | imported {stats['imported']} | rejected {stats['rejected']}")
+
+            with profiler.section("bulk import") as timing:
+                result = import_production_log(store, upload, upload.name, rules, default_supervisor=import_supervisor, progress=on_progress)
+                timing.rows = result['read']
+            bar.progress(1.0, text="Import finished")
+            refresh_rollups()
+            snapshots.notify()
+            st.success(f"Imported {result['imported']} of {result['read']} rows.")
+            if result['rejected']:
+                st.warning(f"{result['rejected']} rows rejected ({result['duplicates']} duplicates).")
+                with open(result['reject_path'], "rb") as f:
+                    st.download_button("Download Reject Report", f.read(), file_name="import_rejects.csv", mime="text/csv")
+                st.dataframe(pd.read_csv(result['reject_path'], nrows=100, dtype=str, keep_default_na=False), hide_index=True)
+
 # --- REPORTING ---
 elif menu == "3. Plan Vs Actual Report":
+    import pandas as pd
+    from bom import part_coverage
+    from engine import FORECAST_COLUMNS, daily_achievement, monthly_report, wip_grid, wip_period_grid, wip_trend
+    from styling import coverage_styles, daily_styles, variance_styles, wip_styles
+    use_context(*CONTEXT_KEYS)
     st.header("📊 Production Reports")
-    tab_wip, tab_daily, tab_monthly = st.tabs(["WIP Status", "Daily Achievement", "Monthly Report"])
+    # Only the selected report is computed; widgets inside a report rerun just its fragment
+    report_views = ["WIP Status", "Daily Achievement", "Monthly Report", "Part Coverage"]
+    if len(PLANTS) > 1:
+        report_views.append("All Plants")
+    report_view = st.radio("Select Report:", report_views, horizontal=True, key="report_view")
 
     # --- WIP STATUS with divisions mapped correctly ---
-    with tab_wip:
+    @st.fragment
+    def wip_status_view():
+        profiler.start_run(f"{menu} / WIP Status")
         st.subheader("WIP Status - Divisions")
         st.info("Divisions: CRF (parts) | CF Assembly (Pre-assembly → ... → CF Final Line) | WD (independent)")
-        division = st.selectbox("Select Division", ["CRF Division", "CF Assembly Division", "WD Division"], key="wip_div_select")
-        wip_date = st.date_input("Select Date for WIP", datetime.now().date(), key="wip_date")
-        date_str = wip_date.strftime("%Y-%m-%d")
-        month_str = wip_date.strftime("%Y-%m")
-        days_in_month = calendar.monthrange(wip_date.year, wip_date.month)[1]
-
-        prod_df = pd.DataFrame(st.session_state.production_data)
-        if prod_df.empty:
+        division = st.selectbox("Select Division", list(DIVISIONS), key="wip_div_select")
+        # Day shows one day's output; the other windows sum it, so WIP rows are the real backlog between areas
+        wip_window = st.radio("WIP Window", ["Day", "Month to Date", "Date Range"], horizontal=True, key="wip_window")
+        if wip_window == "Date Range":
+            today = datetime.now().date()
+            picked = st.date_input("Select Date Range for WIP", (today.replace(day=1), today), key="wip_range")
+            # while the end date is still being picked only the start is set
+            range_from, range_to = picked[0], picked[-1]
+        else:
+            wip_date = st.date_input("Select Date for WIP", datetime.now().date(), key="wip_date")
+            range_from = wip_date if wip_window == "Day" else wip_date.replace(day=1)
+            range_to = wip_date
+        date_from = range_from.strftime("%Y-%m-%d")
+        date_to = range_to.strftime("%Y-%m-%d")
+
+        # a day served from the snapshot needs no sync of the live frame and cube
+        found, grid = precomputed(("wip", division), date_to) if wip_window == "Day" else (False, None)
+        cube = None if found else refresh_rollups()[1]
+        if cube is not None and not cube.days():
             st.info("No production data yet.")
         else:
-            prod_df['Report_Date'] = pd.to_datetime(prod_df['Date']).dt.strftime("%Y-%m-%d")
-
-            if division == "CRF Division":
-                display_areas = ["CRF"]
-                models_in_div = [m for m in st.session_state.crf_models if st.session_state.active_models.get(m, True)]
-            elif division == "WD Division":
-                display_areas = ["WD Final Line"]
-                models_in_div = [m for m in st.session_state.wd_models if st.session_state.active_models.get(m, True)]
-            else:
-                # CF Assembly division (Pre-Assembly, Cabinet Foaming, Door Foaming, CF Final Line)
-                display_areas = ["Pre-Assembly", "Cabinet Foaming", "Door Foaming", "CF Final Line"]
-                models_in_div = [m for m in st.session_state.cf_models if st.session_state.active_models.get(m, True)]
-
-            # Filter production entries for the chosen date and relevant areas
-            filtered = prod_df[(prod_df['Report_Date'] == date_str) & (prod_df['Area'].isin(display_areas))]
-
-            if filtered.empty:
+            if not found:
+                with profiler.section("wip grid") as timing:
+                    if wip_window == "Day":
+                        grid = wip_grid(cube, st.session_state, date_to, division)
+                    else:
+                        grid = wip_period_grid(cube, st.session_state, date_from, date_to, division)
+                    timing.rows = 0 if grid is None else len(grid)
+            if grid is None:
                 st.info("No production data for selected division/date.")
             else:
-                # monthly plans for the month (we use monthly plan as 'Plan (Monthly)' column)
-                monthly_plans_for_month = st.session_state.monthly_plans.get(month_str, {})
-
-                area_plan = {}
-                area_actual = {}
-                for area in display_areas:
-                    plan_values = []
-                    for model in models_in_div:
-                        mon_val = monthly_plans_for_month.get(model, None)
-                        if mon_val is None:
-                            mon_val = st.session_state.plan_data.get(model, {}).get('monthly', None)
-                        if mon_val is None:
-                            plan_values.append(np.nan)
-                        else:
-                            try:
-                                plan_values.append(float(mon_val))
-                            except Exception:
-                                plan_values.append(np.nan)
-                    if len(plan_values) == 0 or np.all(np.isnan(plan_values)):
-                        area_plan[area] = np.nan
-                    else:
-                        area_plan[area] = float(np.nansum(plan_values))
-                    area_actual[area] = int(filtered[filtered['Area'] == area]['Actual'].sum())
-
-                # Build rows: For CF Assembly show WIP between sequential areas; for CRF/WD just show area rows
-                rows = []
-                if division in ("CRF Division", "WD Division"):
-                    for area in display_areas:
-                        rows.append([area, area_plan.get(area, np.nan), area_actual.get(area, 0)])
-                else:
-                    seq = display_areas
-                    rows.append([seq[0], area_plan.get(seq[0], np.nan), area_actual.get(seq[0], 0)])
-                    for i in range(len(seq) - 1):
-                        a_from = seq[i]
-                        a_to = seq[i + 1]
-                        plan_wip = (0.0 if pd.isna(area_plan.get(a_from)) else area_plan.get(a_from)) - (0.0 if pd.isna(area_plan.get(a_to)) else area_plan.get(a_to))
-                        act_wip = area_actual.get(a_from, 0) - area_actual.get(a_to, 0)
-                        rows.append([f"WIP ({a_from} → {a_to})", plan_wip, act_wip])
-                        # next iteration will append next area except last
-                    rows.append([seq[-1], area_plan.get(seq[-1], np.nan), area_actual.get(seq[-1], 0)])
-
-                wip_grid = pd.DataFrame(rows, columns=["Production Area", "Plan (Monthly)", "Act (Day)"])
-
-                # Styling function
-                def style_row_wip(row):
-                    styles = []
-                    plan = row["Plan (Monthly)"]
-                    act = row["Act (Day)"]
-                    styles.append("font-weight: bold;")
-                    if pd.isna(plan):
-                        styles.append("background-color: #f0f0f0; color: #6c757d;")
-                    else:
-                        styles.append("background-color: #e7f3ff; color: #0b5394; font-weight: 600;")
-                    # color Act relative to per-day equivalent where plan exists
-                    if not pd.isna(plan) and plan > 0:
-                        per_day = plan / days_in_month if days_in_month > 0 else 0
-                        if per_day > 0 and act >= per_day:
-                            styles.append("background-color: #d4edda; color: #155724; font-weight: 600;")
-                        elif act == 0:
-                            styles.append("background-color: #f0f0f0; color: #6c757d;")
-                        else:
-                            styles.append("background-color: #fff3cd; color: #856404;")
-                    else:
-                        styles.append("background-color: #f0f0f0; color: #6c757d;")
-                    return styles
-
-                styled = wip_grid.style.apply(style_row_wip, axis=1)
+                plan_column, act_column = grid.columns[2], grid.columns[3]
+                # colour classes computed per column, not per row
+                styled = grid.style.apply(wip_styles, axis=None)
 
                 def fmt_plan(x):
                     return "N/A" if pd.isna(x) else f"{int(round(x))}"
@@ -418,92 +734,42 @@ elif menu == "3. Plan Vs Actual Report":
 
                 styled = styled.format({
                     "Plan (Monthly)": fmt_plan,
-                    "Act (Day)": fmt_act
+                    plan_column: fmt_plan,
+                    act_column: fmt_act
                 })
 
-                st.markdown(f"### WIP Grid — {division} on {date_str}")
-                st.dataframe(styled, hide_index=True)
+                period = date_to if wip_window == "Day" else f"{date_from} to {date_to}"
+                st.markdown(f"### WIP Grid — {division} on {period}")
+                with profiler.section("wip render", rows=len(grid)):
+                    st.dataframe(styled, hide_index=True)
+
+                if wip_window != "Day":
+                    st.markdown("#### WIP Build-up")
+                    with profiler.section("wip trend") as timing:
+                        trend = wip_trend(cube, st.session_state, date_from, date_to, division)
+                        st.line_chart(trend)
+                        timing.rows = len(trend)
 
     # --- DAILY ACHIEVEMENT ---
-    with tab_daily:
+    @st.fragment
+    def daily_achievement_view():
+        profiler.start_run(f"{menu} / Daily Achievement")
         st.subheader("Daily Achievement Report")
         report_date = st.date_input("Select Date", datetime.now().date(), key="daily_report_date")
         date_str = report_date.strftime("%Y-%m-%d")
         area_filter = st.selectbox("Select Area", ["All"] + ALL_AREAS, key="daily_area_filter")
-        daily_df = pd.DataFrame(st.session_state.production_data)
-        if not daily_df.empty:
-            daily_df['Report_Date'] = pd.to_datetime(daily_df['Date']).dt.strftime("%Y-%m-%d")
-            filtered_df = daily_df[daily_df['Report_Date'] == date_str]
-            if area_filter != "All":
-                filtered_df = filtered_df[filtered_df['Area'] == area_filter]
-
-            if not filtered_df.empty:
-                model_summary = filtered_df.groupby(['Model', 'Area'])['Actual'].sum().reset_index()
-                model_summary.rename(columns={'Actual': 'Act'}, inplace=True)
-                daily_plan_for_date = st.session_state.daily_plans.get(date_str, {})
-
-                def get_model_plan(model):
-                    if model in daily_plan_for_date:
-                        try:
-                            return int(daily_plan_for_date.get(model, 0))
-                        except Exception:
-                            return np.nan
-                    return np.nan
-
-                model_summary['Plan'] = model_summary['Model'].apply(get_model_plan)
-
-                def compute_ach(row):
-                    plan = row['Plan']
-                    act = row['Act']
-                    if pd.isna(plan):
-                        return np.nan
-                    if plan == 0:
-                        return 0.0 if act == 0 else 100.0
-                    return (act / plan) * 100.0
-
-                model_summary['Achievement %'] = model_summary.apply(compute_ach, axis=1)
-                model_summary["Act"] = pd.to_numeric(model_summary["Act"], errors="coerce").fillna(0).astype(int)
-                model_summary["Achievement %"] = pd.to_numeric(model_summary["Achievement %"], errors="coerce")
-
-                # Styling for daily table
-                def style_daily_row(row):
-                    styles = []
-                    styles.append("font-weight: bold;")
-                    styles.append("background-color: #f8f9fa; color: #333333;")
-                    plan = row["Plan"]
-                    act = row["Act"]
-                    if not pd.isna(plan) and plan > 0:
-                        if act >= plan:
-                            styles.append("background-color: #d4edda; color: #155724; font-weight: 600;")
-                        elif act == 0:
-                            styles.append("background-color: #f0f0f0; color: #6c757d;")
-                        else:
-                            styles.append("background-color: #fff3cd; color: #856404;")
-                    else:
-                        styles.append("background-color: #f0f0f0; color: #6c757d;")
-                    if pd.isna(plan):
-                        styles.append("background-color: #f0f0f0; color: #6c757d;")
-                    else:
-                        styles.append("background-color: #e7f3ff; color: #0b5394; font-weight: 600;")
-                    ach = row["Achievement %"]
-                    if pd.isna(ach):
-                        styles.append("background-color: #f0f0f0; color: #6c757d;")
-                    else:
-                        try:
-                            val = float(ach)
-                        except Exception:
-                            val = 0.0
-                        if val >= 100:
-                            styles.append("background-color: #d4edda; color: #155724; font-weight: 700;")
-                        elif val >= 90:
-                            styles.append("background-color: #e2f0d9; color: #155724;")
-                        elif val >= 75:
-                            styles.append("background-color: #fff3cd; color: #856404;")
-                        else:
-                            styles.append("background-color: #f8d7da; color: #721c24;")
-                    return styles
-
-                styled_daily = model_summary.style.apply(style_daily_row, axis=1)
+        found, model_summary = precomputed(("daily", area_filter), date_str)
+        cube = None if found else refresh_rollups()[1]
+        if cube is None or cube.days():
+            if not found:
+                with profiler.section("daily achievement") as timing:
+                    model_summary = daily_achievement(cube, st.session_state, date_str, area_filter)
+                    timing.rows = 0 if model_summary is None else len(model_summary)
+
+            if model_summary is not None:
+                # Only the visible page is styled and sent to the browser
+                page = paginate(model_summary, key="daily_page")
+                styled_daily = page.style.apply(daily_styles, axis=None)
 
                 def fmt_plan(x):
                     return "N/A" if pd.isna(x) else f"{int(x)}"
@@ -517,75 +783,180 @@ elif menu == "3. Plan Vs Actual Report":
                 })
 
                 st.markdown(f"### Daily Production for {date_str} (Area: {area_filter})")
-                st.dataframe(styled_daily, hide_index=True)
+                with profiler.section("daily render", rows=len(page)):
+                    st.dataframe(styled_daily, hide_index=True)
 
                 st.markdown("#### Total Actual by Model")
-                graph_data = model_summary.groupby('Model')['Act'].sum()
-                st.bar_chart(graph_data)
+                with profiler.section("daily chart") as timing:
+                    graph_data = model_summary.groupby('Model')['Act'].sum()
+                    st.bar_chart(graph_data)
+                    timing.rows = len(graph_data)
             else:
                 st.info("No production data found for this date/area.")
         else:
             st.info("No production data entered yet.")
 
     # --- MONTHLY REPORT ---
-    with tab_monthly:
+    @st.fragment
+    def monthly_report_view():
+        profiler.start_run(f"{menu} / Monthly Report")
         st.subheader("Monthly Report (Plan vs Actual)")
         month_filter = st.date_input("Select Month (pick any date in month)", datetime.now().date(), key="monthly_date_report")
         month_str = month_filter.strftime("%Y-%m")
         area_filter_month = st.selectbox("Select Area", ["All"] + ALL_AREAS, key="monthly_area_filter")
 
-        monthly_df = pd.DataFrame(st.session_state.production_data)
-        if not monthly_df.empty:
-            monthly_df['Report_Month'] = pd.to_datetime(monthly_df['Date']).dt.strftime("%Y-%m")
-            monthly_filtered = monthly_df[monthly_df['Report_Month'] == month_str]
-            if area_filter_month != "All":
-                monthly_filtered = monthly_filtered[monthly_filtered['Area'] == area_filter_month]
-
-            if not monthly_filtered.empty:
-                report_data = []
-                monthly_plans_for_month = st.session_state.monthly_plans.get(month_str, {})
-
-                # iterate all known models (CRF/CF/WD)
-                all_models = sorted(set(list(st.session_state.crf_models) + list(st.session_state.cf_models) + list(st.session_state.wd_models)))
-                for model in all_models:
-                    plan_qty = monthly_plans_for_month.get(model, st.session_state.plan_data.get(model, {}).get('monthly', 0))
-
-                    # prefer final-line actuals by product type
-                    if model in st.session_state.wd_models:
-                        actuals_final = monthly_filtered[(monthly_filtered['Model'] == model) & (monthly_filtered['Area'] == 'WD Final Line')]['Actual'].sum()
-                    elif model in st.session_state.cf_models:
-                        actuals_final = monthly_filtered[(monthly_filtered['Model'] == model) & (monthly_filtered['Area'] == 'CF Final Line')]['Actual'].sum()
-                    elif model in st.session_state.crf_models:
-                        # CRF part models: only CRF area entries matter
-                        actuals_final = monthly_filtered[(monthly_filtered['Model'] == model) & (monthly_filtered['Area'] == 'CRF')]['Actual'].sum()
-                    else:
-                        actuals_final = 0
-
-                    if actuals_final == 0:
-                        # fallback to sum across all areas for that model
-                        actuals = monthly_filtered[monthly_filtered['Model'] == model]['Actual'].sum()
-                    else:
-                        actuals = actuals_final
-
-                    try:
-                        actuals = int(actuals)
-                    except Exception:
-                        actuals = int(actuals or 0)
-
-                    report_data.append({
-                        "Model": model,
-                        "Category": monthly_filtered[monthly_filtered['Model'] == model]['Category'].iloc[0] if not monthly_filtered[monthly_filtered['Model'] == model].empty else "N/A",
-                        "Planned Qty": int(plan_qty or 0),
-                        "Actual Qty": actuals,
-                        "Variance": actuals - int(plan_qty or 0)
-                    })
-
-                report_df = pd.DataFrame(report_data)
-                report_df = report_df[(report_df['Planned Qty'] != 0) | (report_df['Actual Qty'] != 0)]
-
-                st.dataframe(report_df.style.applymap(lambda x: 'color: red' if x < 0 else 'color: green', subset=['Variance']))
-                st.bar_chart(report_df.set_index('Model')[['Planned Qty', 'Actual Qty']])
+        today = datetime.now().strftime("%Y-%m-%d")
+        found, report_df = (False, None) if month_str != today[:7] else precomputed(("monthly", area_filter_month), today)
+        cube = None if found else refresh_rollups()[1]
+        if cube is None or cube.days():
+            if not found:
+                with profiler.section("monthly report") as timing:
+                    report_df = monthly_report(cube, st.session_state, month_str, area_filter_month, as_of=today)
+                    timing.rows = 0 if report_df is None else len(report_df)
+
+            if report_df is not None:
+                st.caption("Forecast columns project month-end output from the trailing 3/7/14-day run rate "
+                           "over the working days left in the month.")
+                page = paginate(report_df, key="monthly_page")
+                with profiler.section("monthly render", rows=len(page)):
+                    st.dataframe(page.style.apply(variance_styles, axis=None, subset=['Variance', FORECAST_COLUMNS[-1]]))
+                at_risk = report_df[(report_df["Planned Qty"] > 0) & (report_df[FORECAST_COLUMNS[-1]] < 0)]
+                if not at_risk.empty:
+                    st.warning(f"{len(at_risk)} model(s) projected to finish the month below plan: "
+                               f"{', '.join(at_risk['Model'].head(10))}{' ...' if len(at_risk) > 10 else ''}")
+                with profiler.section("monthly chart", rows=len(report_df)):
+                    st.bar_chart(report_df.set_index('Model')[['Planned Qty', 'Actual Qty']])
             else:
                 st.info("No production data found for this month/area.")
         else:
             st.info("No production data entered yet.")
+
+    # --- CRF PART COVERAGE ---
+    @st.fragment
+    def part_coverage_view():
+        profiler.start_run(f"{menu} / Part Coverage")
+        _production, cube = refresh_rollups()
+        st.subheader("CRF Part Coverage (BOM explosion of CF plan and output)")
+        coverage_date = st.date_input("Month to date through", datetime.now().date(), key="coverage_date")
+        date_str = coverage_date.strftime("%Y-%m-%d")
+        with profiler.section("part coverage") as timing:
+            coverage = part_coverage(cube, st.session_state, date_str)
+            timing.rows = 0 if coverage is None else len(coverage)
+        if coverage is None:
+            st.info("No bill of materials yet. Link CF models to CRF parts under 4. Settings → Bill of Materials.")
+        else:
+            styled = coverage.style.apply(coverage_styles, axis=None).format({
+                "Planned Demand (Month)": "{:,.0f}",
+                "Consumed (CF Final Line)": "{:,.0f}",
+                "Net Available": "{:,.0f}",
+                "Daily Demand": "{:,.1f}",
+                "Coverage Days": lambda x: "N/A" if pd.isna(x) else f"{x:.1f}",
+            })
+            st.markdown(f"### Part Coverage — {date_str[:7]} through {date_str}")
+            st.dataframe(styled, hide_index=True)
+            short = coverage[coverage["Net Available"] < 0]
+            if not short.empty:
+                st.warning(f"{len(short)} part(s) short of CF Final Line consumption: {', '.join(short['Part'])}")
+
+    # --- ALL PLANTS (consolidated) ---
+    @st.fragment
+    def all_plants_view():
+        from consolidate import consolidated_report
+        profiler.start_run(f"{menu} / All Plants")
+        st.subheader(f"All Plants ({', '.join(PLANTS)})")
+        as_of = st.date_input("As of", datetime.now().date(), key="consolidated_date")
+        date_str = as_of.strftime("%Y-%m-%d")
+        # each plant's partition is reported in its own process
+        with profiler.section("consolidated report", rows=len(PLANTS)):
+            try:
+                monthly, wip = consolidated_report({p: plant_db_path(p) for p in PLANTS}, date_str, parallel=True)
+            except (TimeoutError, RuntimeError) as exc:
+                st.error(f"Consolidated report failed: {exc}")
+                return
+
+        st.markdown(f"### Plan vs Actual — {date_str[:7]} (forecast as of {date_str})")
+        if monthly is None:
+            st.info("No plant has production this month.")
+        else:
+            detail, by_plant, by_model = monthly
+            st.dataframe(by_plant.style.apply(variance_styles, axis=None, subset=['Variance', FORECAST_COLUMNS[-1]]), hide_index=True)
+            st.markdown("#### By Model (all plants)")
+            page = paginate(by_model, key="consolidated_page")
+            st.dataframe(page.style.apply(variance_styles, axis=None, subset=['Variance', FORECAST_COLUMNS[-1]]), hide_index=True)
+            with st.expander("Per-plant detail"):
+                st.dataframe(detail, hide_index=True)
+
+        st.markdown(f"### WIP — {date_str}")
+        if not wip:
+            st.info("No plant has production on this date.")
+        for division, (total, detail) in wip.items():
+            st.markdown(f"#### {division}")
+            styled = total.style.apply(wip_styles, axis=None).format({
+                column: (lambda x: "N/A" if pd.isna(x) else f"{int(round(x))}") for column in total.columns[1:3]
+            })
+            st.dataframe(styled, hide_index=True)
+            with st.expander(f"{division} by plant"):
+                st.dataframe(detail, hide_index=True)
+
+    if report_view == "WIP Status":
+        wip_status_view()
+    elif report_view == "Daily Achievement":
+        daily_achievement_view()
+    elif report_view == "Monthly Report":
+        monthly_report_view()
+    elif report_view == "Part Coverage":
+        part_coverage_view()
+    else:
+        all_plants_view()
+
+# --- ANDON BOARD ---
+elif menu == "5. Andon Board":
+    import time
+    import pandas as pd
+    from buckets import SHIFTS, andon_board, current_shift
+    from styling import variance_styles
+    use_context(*CONTEXT_KEYS)
+    st.header("🚦 Andon Board")
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        refresh_seconds = st.selectbox("Refresh every (seconds)", [5, 10, 30, 60], key="andon_refresh")
+    with col2:
+        andon_areas = st.multiselect("Areas", ALL_AREAS, default=ALL_AREAS, key="andon_areas")
+
+    # Each refresh reads only the records committed since the previous one
+    @st.fragment(run_every=refresh_seconds)
+    def andon_view():
+        profiler.start_run(f"{menu} / Live")
+        buckets = get_hourly_buckets(plant)
+        now = datetime.now()
+        today = now.strftime("%Y-%m-%d")
+        t0 = time.perf_counter()
+        with profiler.section("andon poll") as timing:
+            new_rows = timing.rows = buckets.poll(store)
+        poll_ms = (time.perf_counter() - t0) * 1000
+        # the board looks back at most one shift, into yesterday
+        buckets.forget_before((now.date() - timedelta(days=1)).isoformat())
+        shift, shift_day = current_shift(now)
+        st.caption(f"Updated {now.strftime('%H:%M:%S')} · {new_rows} new record(s) read in {poll_ms:.0f} ms")
+        st.markdown(f"### Shift {SHIFTS[shift][0]} (from {SHIFTS[shift][1]:02d}:00, {shift_day})")
+
+        with profiler.section("andon board") as timing:
+            board = andon_board(buckets, st.session_state, now, andon_areas)
+            timing.rows = len(board)
+        for column, row in zip(st.columns(max(len(board), 1)), board.itertuples(index=False)):
+            with column:
+                gap = None if pd.isna(row.Gap) else f"{row.Gap:+.0f} vs due"
+                st.metric(row.Area, f"{row.Today:,}", delta=gap)
+        st.dataframe(board.style.apply(variance_styles, axis=None, subset=["Gap"]).format({
+            "Plan (Day)": lambda x: "N/A" if pd.isna(x) else f"{x:,.0f}",
+            "Due Now": lambda x: "N/A" if pd.isna(x) else f"{x:,.0f}",
+            "Gap": lambda x: "N/A" if pd.isna(x) else f"{x:+,.0f}",
+        }), hide_index=True)
+
+        st.markdown(f"#### Actual by Hour — {today}")
+        hourly = buckets.hourly(today)
+        st.bar_chart(hourly[[a for a in andon_areas if a in hourly]].iloc[:now.hour + 1])
+        st.markdown(f"#### Shifts starting {shift_day}")
+        st.dataframe(buckets.shift_totals(shift_day).reindex(andon_areas).dropna(how="all"))
+
+    andon_view()
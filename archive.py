@@ -0,0 +1,124 @@
+# Tiered storage of closed months (Parquet summaries + cold raw archive)
+#
+# Once a month is closed the reports only need its day x area x model totals
+# (its plans live in the config table already). compact_closed() rolls every
+# closed month's live records into two zstd-compressed Parquet files under the
+# store's archive directory, partitioned by month:
+#
+#   summary/month=YYYY-MM/part-<last id>.parquet   aggregated cells, read by the reports
+#   raw/month=YYYY-MM/part-<last id>.parquet       the records themselves, for audits
+#
+# and then, in one store commit, deletes those records from the live table,
+# registers the part and keeps their natural keys so a re-import still skips
+# them. Only registered parts are read: files left by an interrupted run are
+# ignored and overwritten by the next one. Records entered later for an
+# archived month stay live (and are counted with its cells) until the next run
+# adds another part.
+#
+# ProductionFrame reads the archived cells with its first sync and RollupCube
+# seeds from them, so every report covers archived months transparently while
+# the frame only parses the live months. rehydrate() reads a month's raw records
+# back; restore_month() moves them into the live table again.
+import os
+import shutil
+from datetime import date, timedelta
+
+import pandas as pd
+
+from rollup import CELL_COLUMNS, aggregate_rows, merge_cells
+
+# Days after a month's last day before it counts as closed (late entries, corrections)
+CLOSE_AFTER_DAYS = 7
+TIERS = ("summary", "raw")
+
+
+def archive_dir(store):
+    """Archive directory kept next to the store file (production.db -> production_archive/)."""
+    return os.path.splitext(store.path)[0] + "_archive"
+
+
+def _part_path(store, tier, month_str, part):
+    return os.path.join(archive_dir(store), tier, f"month={month_str}", f"{part}.parquet")
+
+
+def _write(df, path):
+    # write then rename, so a crash never leaves a truncated part under the final name
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    df.to_parquet(path + ".tmp", index=False, compression="zstd")
+    os.replace(path + ".tmp", path)
+
+
+def closed_months(store, as_of, close_after_days=CLOSE_AFTER_DAYS):
+    """Months with live records that ended more than close_after_days before as_of (YYYY-MM-DD)."""
+    open_from = (date.fromisoformat(as_of) - timedelta(days=close_after_days)).isoformat()[:7]
+    return [month for month in store.months() if month < open_from]
+
+
+def compact_month(store, month_str):
+    """Move a month's live records into the archive; returns how many were archived."""
+    records = store.month_records(month_str)
+    if records.empty:
+        return 0
+    last_id = int(records["id"].iloc[-1])
+    part = f"part-{last_id}"
+    _write(records, _part_path(store, "raw", month_str, part))
+    _write(aggregate_rows(records), _part_path(store, "summary", month_str, part))
+    store.archive_month(month_str, part, last_id, len(records), records["Natural_Key"].dropna().tolist())
+    return len(records)
+
+
+def compact_closed(store, as_of, close_after_days=CLOSE_AFTER_DAYS):
+    """Compact every closed month; returns {month: records archived}."""
+    return {month: compact_month(store, month) for month in closed_months(store, as_of, close_after_days)}
+
+
+def archived_cells(store, date_from=None, date_to=None):
+    """Archived (Report_Date + CELL_COLUMNS) cells, optionally limited to [date_from, date_to]."""
+    paths = [
+        _part_path(store, "summary", month, part)
+        for month, part, _records in store.archive_parts()
+        if (date_from is None or month >= date_from[:7]) and (date_to is None or month <= date_to[:7])
+    ]
+    if not paths:
+        return pd.DataFrame(columns=["Report_Date"] + CELL_COLUMNS)
+    cells = pd.concat([pd.read_parquet(path) for path in paths], ignore_index=True)
+    if date_from is not None:
+        cells = cells[cells["Report_Date"] >= date_from]
+    if date_to is not None:
+        cells = cells[cells["Report_Date"] <= date_to]
+    return merge_cells(cells)
+
+
+def rehydrate(store, month_str):
+    """An archived month's raw records (with id and Natural_Key), in submission order."""
+    paths = [_part_path(store, "raw", month, part) for month, part, _records in store.archive_parts() if month == month_str]
+    if not paths:
+        return None
+    records = pd.concat([pd.read_parquet(path) for path in paths], ignore_index=True)
+    return records.sort_values("id", kind="stable").reset_index(drop=True)
+
+
+def restore_month(store, month_str):
+    """Put an archived month's records back in the live table and drop its parts; returns how many."""
+    records = rehydrate(store, month_str)
+    if records is None:
+        return 0
+    records = records.astype(object).where(records.notna(), None)
+    store.restore_month(month_str, records.to_dict("records"))
+    for tier in TIERS:
+        shutil.rmtree(os.path.dirname(_part_path(store, tier, month_str, "part")), ignore_errors=True)
+    return len(records)
+
+
+def archive_summary(store):
+    """Archived months: parts, records and bytes on disk per tier."""
+    rows = {}
+    for month, part, records in store.archive_parts():
+        row = rows.setdefault(month, {"Month": month, "Parts": 0, "Records": 0, "Summary (KB)": 0.0, "Raw (KB)": 0.0})
+        row["Parts"] += 1
+        row["Records"] += records
+        for tier, column in zip(TIERS, ["Summary (KB)", "Raw (KB)"]):
+            path = _part_path(store, tier, month, part)
+            if os.path.exists(path):
+                row[column] += os.path.getsize(path) / 1024
+    return pd.DataFrame(list(rows.values()), columns=["Month", "Parts", "Records", "Summary (KB)", "Raw (KB)"])
@@ -0,0 +1,75 @@
+# Memory per production record, before and after column encoding
+#
+#   python bench/bench_memory.py --sizes 10000 100000 --output memory.json
+#
+# For each size, the same seeded records are held as:
+#   session_dicts   list of per-record dicts (the original production_data layout)
+#   object_frame    pd.DataFrame(records) with Python string columns
+#   typed_strings   the typed frame layout with string columns (type_rows)
+#   encoded_frame   ProductionFrame: registry-coded categoricals, int32 Actual
+# and the bytes per row of each are printed (and optionally written as JSON).
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+from frame import ProductionFrame, type_rows  # noqa: E402
+from store import ProductionStore  # noqa: E402
+from synthetic import synthetic_context, synthetic_records  # noqa: E402
+
+LAYOUTS = ["session_dicts", "object_frame", "typed_strings", "encoded_frame"]
+
+
+def measure(n, seed):
+    ctx = synthetic_context(seed=seed)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    records = synthetic_records(n, ctx, seed=seed)
+    gc.collect()
+    dict_bytes = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    sizes = {"session_dicts": dict_bytes}
+    sizes["object_frame"] = int(pd.DataFrame(records).memory_usage(deep=True).sum())
+
+    store = ProductionStore(os.path.join(tempfile.mkdtemp(), "memory.db"))
+    store.append(records)
+    del records
+    sizes["typed_strings"] = int(type_rows(store.rows_since(0)).memory_usage(deep=True).sum())
+    production = ProductionFrame()
+    production.sync(store)
+    sizes["encoded_frame"] = production.memory_usage()
+    return {layout: round(sizes[layout] / n, 1) for layout in LAYOUTS}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write bytes-per-row results as JSON")
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'rows':>9} " + " ".join(f"{layout:>15}" for layout in LAYOUTS) + "   (bytes per row)")
+    for n in args.sizes:
+        results[str(n)] = measure(n, args.seed)
+        print(f"{n:>9} " + " ".join(f"{results[str(n)][layout]:>15.1f}" for layout in LAYOUTS))
+        ratio = results[str(n)]["session_dicts"] / results[str(n)]["encoded_frame"]
+        print(f"{'':>9} encoded frame is {ratio:.1f}x smaller than session dicts")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+# Cold start: time to a usable Production Entry form, against a budget
+#
+#   python bench/bench_startup.py --repeat 5 --budget-ms 1400 --output startup.json
+#
+# Each sample starts a fresh interpreter (as a serverless cold start does) that
+# runs app.py through Streamlit's AppTest: the first run lands on the default
+# page, the second opens "2. Production Entry". Prints the wall time from
+# process start to the rendered form and which heavy modules (pandas, NumPy,
+# pyarrow) got imported. Exits non-zero when the median exceeds the budget or
+# a heavy module was loaded on the way.
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+HEAVY_MODULES = ["pandas", "numpy", "pyarrow"]
+
+# Runs in the child interpreter; prints one JSON line
+CHILD = """
+import json, sys, time
+import streamlit
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+harness = time.perf_counter() - t0
+at = AppTest.from_file(sys.argv[1], default_timeout=60)
+t1 = time.perf_counter()
+at.run()
+t2 = time.perf_counter()
+at.radio[0].set_value("2. Production Entry").run()
+t3 = time.perf_counter()
+print(json.dumps({
+    "harness_s": harness,
+    "first_run_s": t2 - t1,
+    "entry_run_s": t3 - t2,
+    "errors": [str(e.value) for e in at.exception],
+    "heavy": [m for m in sys.argv[2:] if m in sys.modules],
+}))
+"""
+
+
+def cold_start(db_path):
+    env = dict(os.environ, PRODUCTION_DB=db_path)
+    t0 = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", CHILD, APP] + HEAVY_MODULES,
+                         env=env, capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - t0
+    sample = json.loads(out.stdout.strip().splitlines()[-1])
+    # importing AppTest on top of streamlit is harness cost, not the app's
+    sample["cold_start_s"] = wall - sample["harness_s"]
+    return sample
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--budget-ms", type=float, default=1400.0, help="median cold start budget")
+    parser.add_argument("--output", help="write the samples as JSON")
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "startup.db")
+    samples = [cold_start(db_path) for _ in range(args.repeat)]
+    for i, s in enumerate(samples, start=1):
+        print(f"run {i}: cold start {s['cold_start_s'] * 1000:7.0f} ms "
+              f"(first page {s['first_run_s'] * 1000:.0f} ms, entry form {s['entry_run_s'] * 1000:.0f} ms) "
+              f"heavy modules: {', '.join(s['heavy']) or 'none'}")
+
+    median_ms = statistics.median(s["cold_start_s"] for s in samples) * 1000
+    heavy = sorted({m for s in samples for m in s["heavy"]})
+    errors = [e for s in samples for e in s["errors"]]
+    print(f"median cold start {median_ms:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"median_ms": median_ms, "budget_ms": args.budget_ms, "samples": samples}, f, indent=2)
+
+    failed = False
+    if errors:
+        print(f"FAIL: app raised {errors[0]}")
+        failed = True
+    if median_ms > args.budget_ms:
+        print("FAIL: over budget")
+        failed = True
+    if heavy:
+        print(f"FAIL: Production Entry imported {', '.join(heavy)}")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
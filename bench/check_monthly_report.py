@@ -0,0 +1,147 @@
+# Regression check: Monthly Plan vs Actual against the original per-model loop
+#
+#   python bench/check_monthly_report.py --records 20000 --seeds 0 1 2
+#
+# The report used to be built by masking the month's records once per model
+# (final-line actuals by family, falling back to the all-area total, first-row
+# category). reference_report() keeps that loop verbatim; for each seed the
+# check scrambles synthetic records (models logged on foreign areas, an
+# unregistered model, records outside the month, models without production)
+# and compares it with engine.monthly_plan_vs_actual on the raw records and
+# with engine.monthly_report on the rollup, for "All" and every area.
+# Prints every mismatch and exits non-zero if there was one.
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from context import ALL_AREAS  # noqa: E402
+from engine import all_models, monthly_plan_vs_actual, monthly_report  # noqa: E402
+from frame import ProductionFrame  # noqa: E402
+from rollup import RollupCube  # noqa: E402
+from store import ProductionStore  # noqa: E402
+from synthetic import synthetic_context, synthetic_records  # noqa: E402
+
+MONTH = "2026-10"
+OTHER_MONTH = "2026-11"
+
+
+def reference_report(monthly_filtered, models, wd_models, cf_models, crf_models, monthly_plans_for_month, plan_data):
+    """The pre-vectorization per-model loop from the Monthly Report tab."""
+    report_data = []
+    for model in models:
+        plan_qty = monthly_plans_for_month.get(model, plan_data.get(model, {}).get('monthly', 0))
+
+        # prefer final-line actuals by product type
+        if model in wd_models:
+            actuals_final = monthly_filtered[(monthly_filtered['Model'] == model) & (monthly_filtered['Area'] == 'WD Final Line')]['Actual'].sum()
+        elif model in cf_models:
+            actuals_final = monthly_filtered[(monthly_filtered['Model'] == model) & (monthly_filtered['Area'] == 'CF Final Line')]['Actual'].sum()
+        elif model in crf_models:
+            actuals_final = monthly_filtered[(monthly_filtered['Model'] == model) & (monthly_filtered['Area'] == 'CRF')]['Actual'].sum()
+        else:
+            actuals_final = 0
+
+        if actuals_final == 0:
+            actuals = monthly_filtered[monthly_filtered['Model'] == model]['Actual'].sum()
+        else:
+            actuals = actuals_final
+
+        try:
+            actuals = int(actuals)
+        except Exception:
+            actuals = int(actuals or 0)
+
+        report_data.append({
+            "Model": model,
+            "Category": monthly_filtered[monthly_filtered['Model'] == model]['Category'].iloc[0] if not monthly_filtered[monthly_filtered['Model'] == model].empty else "N/A",
+            "Planned Qty": int(plan_qty or 0),
+            "Actual Qty": actuals,
+            "Variance": actuals - int(plan_qty or 0)
+        })
+
+    report_df = pd.DataFrame(report_data)
+    return report_df[(report_df['Planned Qty'] != 0) | (report_df['Actual Qty'] != 0)]
+
+
+def scrambled_case(n, seed):
+    """Synthetic context and records with the cases the per-family happy path never hits."""
+    rng = np.random.default_rng(seed + 1000)
+    ctx = synthetic_context(cf_models=12, wd_models=6, crf_models=8, month=MONTH, seed=seed)
+    records = synthetic_records(n, ctx, month=MONTH, seed=seed)
+    models = ctx["crf_models"] + ctx["cf_models"] + ctx["wd_models"]
+    for record in records:
+        pick = rng.random()
+        if pick < 0.15:
+            # a model logged on another family's area
+            record["Model"] = models[int(rng.integers(len(models)))]
+        elif pick < 0.17:
+            record["Model"] = "Unregistered-Model"
+        elif pick < 0.22:
+            record["Date"] = f"{OTHER_MONTH}-01{record['Date'][10:]}"
+    # no production at all for a few models; some plans cleared so zero rows drop
+    silent = set(rng.choice(models, size=4, replace=False))
+    records = [r for r in records if r["Model"] not in silent]
+    for model in rng.choice(models, size=5, replace=False):
+        ctx["monthly_plans"][MONTH].pop(model, None)
+        ctx["plan_data"][model] = {'monthly': int(rng.choice([0, 150])), 'daily': 0}
+    return ctx, records
+
+
+def compare(label, expected, actual):
+    try:
+        pd.testing.assert_frame_equal(expected, actual)
+    except AssertionError as exc:
+        print(f"MISMATCH {label}\n{exc}")
+        return False
+    return True
+
+
+def check(n, seed):
+    ctx, records = scrambled_case(n, seed)
+    store = ProductionStore(os.path.join(tempfile.mkdtemp(), "check.db"))
+    store.append(records)
+    production = ProductionFrame()
+    production.sync(store)
+    cube = RollupCube().sync(production)
+
+    raw = pd.DataFrame(records)
+    raw = raw[raw["Date"].str.startswith(MONTH)]
+    models = all_models(ctx)
+    args = (ctx["wd_models"], ctx["cf_models"], ctx["crf_models"], ctx["monthly_plans"].get(MONTH, {}), ctx["plan_data"])
+
+    ok = True
+    for area in ["All"] + ALL_AREAS:
+        monthly_filtered = raw if area == "All" else raw[raw["Area"] == area]
+        if monthly_filtered.empty:
+            # the tab showed "no data" rather than a table
+            if monthly_report(cube, ctx, MONTH, area) is not None:
+                print(f"MISMATCH seed={seed} area={area} rollup: report for a month/area without production")
+                ok = False
+            continue
+        expected = reference_report(monthly_filtered, models, *args)
+        ok &= compare(f"seed={seed} area={area} records", expected, monthly_plan_vs_actual(monthly_filtered, models, *args))
+        ok &= compare(f"seed={seed} area={area} rollup", expected, monthly_report(cube, ctx, MONTH, area))
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=5000)
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0, 1, 2, 3, 4])
+    args = parser.parse_args()
+
+    failed = [seed for seed in args.seeds if not check(args.records, seed)]
+    if failed:
+        print(f"monthly report differs from the per-model loop for seeds {failed}")
+        sys.exit(1)
+    print(f"monthly report matches the per-model loop ({len(args.seeds)} seeds, {args.records} records, {len(ALL_AREAS) + 1} area filters)")
+
+
+if __name__ == "__main__":
+    main()
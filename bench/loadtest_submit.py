@@ -0,0 +1,129 @@
+# Load test: N supervisors pressing "SUBMIT ALL ENTRIES" at the same moment
+#
+#   python bench/loadtest_submit.py --submitters 30 --batches 20 --batch-size 12 --max-p95-ms 250
+#
+# Every submitter thread waits on a barrier, then commits its batches through
+# ProductionStore.append while reader threads keep querying the same file for
+# --read-seconds (at least until the last submit). Readers run one query before
+# the barrier, so pandas' import and their connection are not timed as a read.
+# Prints commit/read latency percentiles and exits non-zero when the p95 commit
+# latency exceeds the budget or rows go missing.
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from store import ProductionStore  # noqa: E402
+
+AREAS = ["CRF", "Pre-Assembly", "Cabinet Foaming", "Door Foaming", "CF Final Line", "WD Final Line"]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def make_batch(submitter, batch_no, size):
+    area = AREAS[submitter % len(AREAS)]
+    return [
+        {
+            "Date": "2026-01-15 18:00",
+            "Area": area,
+            "Supervisor": f"sup-{submitter}",
+            "Category": "Load Test",
+            "Model": f"M-{(batch_no + i) % 40}",
+            "Actual": 1 + i,
+            "Product": "CF",
+        }
+        for i in range(size)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--submitters", type=int, default=30)
+    parser.add_argument("--batches", type=int, default=20, help="batches per submitter")
+    parser.add_argument("--batch-size", type=int, default=12, help="records per batch")
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--read-seconds", type=float, default=2.0, help="how long readers keep querying")
+    parser.add_argument("--max-p95-ms", type=float, default=250.0)
+    parser.add_argument("--db", default=None, help="database file (default: a temp file)")
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(), "loadtest.db")
+    store = ProductionStore(path)
+    # the main thread joins the barrier so timing starts once readers are warm
+    start = threading.Barrier(args.submitters + args.readers + 1)
+    stop = threading.Event()
+    commit_ms = []
+    read_ms = []
+    errors = []
+    lock = threading.Lock()
+
+    def submitter(n):
+        start.wait()
+        for b in range(args.batches):
+            t0 = time.perf_counter()
+            try:
+                store.append(make_batch(n, b, args.batch_size))
+            except Exception as exc:  # report, don't hide
+                errors.append(exc)
+                continue
+            with lock:
+                commit_ms.append((time.perf_counter() - t0) * 1000)
+
+    def reader():
+        # warm-up: the store imports pandas with the first query
+        store.query("2026-01-15", "2026-01-15", areas=["CF Final Line"])
+        start.wait()
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            store.query("2026-01-15", "2026-01-15", areas=["CF Final Line"])
+            with lock:
+                read_ms.append((time.perf_counter() - t0) * 1000)
+
+    threads = [threading.Thread(target=submitter, args=(n,)) for n in range(args.submitters)]
+    readers = [threading.Thread(target=reader) for _ in range(args.readers)]
+    for t in threads + readers:
+        t.start()
+    start.wait()
+    t0 = time.perf_counter()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    stop.wait(max(0.0, args.read_seconds - elapsed))
+    stop.set()
+    for t in readers:
+        t.join()
+
+    expected = args.submitters * args.batches * args.batch_size
+    stored = len(store.query())
+    p95 = percentile(commit_ms, 95)
+    print(f"submitters={args.submitters} batches={len(commit_ms)} rows={stored}/{expected} in {elapsed:.2f}s")
+    print(f"commit ms: p50={percentile(commit_ms, 50):.1f} p95={p95:.1f} max={max(commit_ms, default=0):.1f} "
+          f"mean={statistics.fmean(commit_ms) if commit_ms else 0:.1f}")
+    print(f"read ms:   p50={percentile(read_ms, 50):.1f} p95={percentile(read_ms, 95):.1f} "
+          f"max={max(read_ms, default=0):.1f} ({len(read_ms)} reads in {max(elapsed, args.read_seconds):.1f}s)")
+
+    failed = False
+    if errors:
+        print(f"FAIL: {len(errors)} submits raised, first: {errors[0]!r}")
+        failed = True
+    if stored != expected:
+        print(f"FAIL: expected {expected} rows, found {stored}")
+        failed = True
+    if p95 > args.max_p95_ms:
+        print(f"FAIL: p95 commit latency {p95:.1f} ms over budget {args.max_p95_ms:.1f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
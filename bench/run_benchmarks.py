@@ -0,0 +1,161 @@
+# Report path benchmarks on synthetic data
+#
+#   python bench/run_benchmarks.py                         # 10k and 100k rows
+#   python bench/run_benchmarks.py --sizes 10000 100000 1000000
+#   python bench/run_benchmarks.py --save-baseline         # store results as the baseline
+#
+# Each size loads seeded records into a temporary store, then times DataFrame
+# construction (typed frame sync), the rollup build, the WIP grid, Daily
+# Achievement, Monthly Report, part coverage, the CF chain schedule (full and
+# incremental re-solve) and table styling separately
+# (median of --repeat runs). Results are written as JSON; timings slower than
+# the stored baseline by more than --tolerance are flagged and make the run exit 1.
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+from bom import part_coverage  # noqa: E402
+from context import DIVISIONS  # noqa: E402
+from engine import daily_achievement, monthly_report, wip_grid, wip_period_grid, wip_trend  # noqa: E402
+from frame import ProductionFrame  # noqa: E402
+from rollup import RollupCube  # noqa: E402
+from scheduler import chain_models, chain_state, schedule_chain  # noqa: E402
+from store import ProductionStore  # noqa: E402
+from styling import daily_styles, variance_styles  # noqa: E402
+from synthetic import synthetic_context, synthetic_records  # noqa: E402
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+MONTH = "2026-10"
+REPORT_DATE = "2026-10-15"
+# Differences under this many seconds are noise, whatever the ratio
+NOISE_FLOOR = 0.005
+
+
+def timed(fn, repeat):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples), result
+
+
+def bench_size(n, repeat, seed):
+    ctx = synthetic_context(month=MONTH, seed=seed)
+    records = synthetic_records(n, ctx, month=MONTH, seed=seed)
+    timings = {}
+
+    timings["dataframe_from_records"], _ = timed(lambda: pd.DataFrame(records), repeat)
+
+    store = ProductionStore(os.path.join(tempfile.mkdtemp(), "bench.db"))
+    t0 = time.perf_counter()
+    for start in range(0, n, 50000):
+        store.append(records[start:start + 50000])
+    timings["store_load"] = time.perf_counter() - t0
+    del records
+
+    timings["frame_build"], production = timed(lambda: _fresh_frame(store), repeat)
+    timings["frame_sync_unchanged"], _ = timed(lambda: production.sync(store), repeat)
+    timings["rollup_build"], cube = timed(lambda: RollupCube().sync(production), repeat)
+
+    timings["wip_grid"], _ = timed(lambda: [wip_grid(cube, ctx, REPORT_DATE, d) for d in DIVISIONS], repeat)
+    timings["wip_month_to_date"], _ = timed(
+        lambda: [wip_period_grid(cube, ctx, f"{MONTH}-01", REPORT_DATE, d) for d in DIVISIONS], repeat)
+    timings["wip_trend"], _ = timed(lambda: [wip_trend(cube, ctx, f"{MONTH}-01", REPORT_DATE, d) for d in DIVISIONS], repeat)
+    timings["daily_achievement"], daily = timed(lambda: daily_achievement(cube, ctx, REPORT_DATE, "All"), repeat)
+    timings["monthly_report"], monthly = timed(lambda: monthly_report(cube, ctx, MONTH, "All", as_of=REPORT_DATE), repeat)
+    timings["part_coverage"], _ = timed(lambda: part_coverage(cube, ctx, REPORT_DATE), repeat)
+    models = chain_models(ctx)
+    done, wip = chain_state(cube, models, MONTH, REPORT_DATE)
+    timings["line_schedule"], schedule = timed(
+        lambda: schedule_chain(ctx, MONTH, done=done, wip=wip, through=REPORT_DATE), repeat)
+    timings["line_reschedule"], _ = timed(
+        lambda: schedule_chain(ctx, MONTH, done=done, wip=wip, through=REPORT_DATE, previous=schedule), repeat)
+    timings["styling"], _ = timed(
+        lambda: (
+            daily.style.apply(daily_styles, axis=None).to_html(),
+            monthly.style.apply(variance_styles, axis=None, subset=["Variance"]).to_html(),
+        ),
+        repeat,
+    )
+    return timings
+
+
+def _fresh_frame(store):
+    production = ProductionFrame()
+    production.sync(store)
+    return production
+
+
+def compare(results, baseline, tolerance):
+    """List of (size, step, baseline_s, current_s) slower than baseline * (1 + tolerance)."""
+    regressions = []
+    for size, steps in results.items():
+        for step, current in steps.items():
+            before = baseline.get(size, {}).get(step)
+            if before is None:
+                continue
+            if current > before * (1 + tolerance) and current - before > NOISE_FLOOR:
+                regressions.append((size, step, before, current))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=os.path.join(BENCH_DIR, "results.json"))
+    parser.add_argument("--baseline", default=os.path.join(BENCH_DIR, "baseline.json"))
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs baseline (0.25 = 25%%)")
+    parser.add_argument("--save-baseline", action="store_true", help="write these results as the new baseline")
+    args = parser.parse_args()
+
+    results = {}
+    for n in args.sizes:
+        print(f"== {n} rows")
+        results[str(n)] = bench_size(n, args.repeat, args.seed)
+        for step, seconds in results[str(n)].items():
+            print(f"  {step:<24} {seconds * 1000:10.1f} ms")
+
+    payload = {
+        "meta": {"python": platform.python_version(), "pandas": pd.__version__, "machine": platform.machine(),
+                 "repeat": args.repeat, "seed": args.seed, "created": time.strftime("%Y-%m-%d %H:%M:%S")},
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(payload, f, indent=2)
+    print(f"results written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(payload, f, indent=2)
+        print(f"baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("no baseline stored; run with --save-baseline to create one")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+    regressions = compare(results, baseline, args.tolerance)
+    for size, step, before, current in regressions:
+        print(f"REGRESSION {size} rows / {step}: {before * 1000:.1f} ms -> {current * 1000:.1f} ms")
+    if regressions:
+        return 1
+    print(f"no regressions beyond {args.tolerance:.0%} of baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
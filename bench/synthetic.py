@@ -0,0 +1,83 @@
+# Seeded synthetic plant data for benchmarks
+#
+# Produces production records shaped like real "SUBMIT ALL ENTRIES" batches
+# (shift-end timestamps, per-supervisor batches, every CF/WD area) plus a
+# planning context with monthly and daily plans, so report paths can be timed
+# at production scale without a live database.
+import calendar
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from context import CF_AREAS, WD_AREAS, default_context  # noqa: E402
+
+SHIFT_ENDS = ["06:00", "14:00", "22:00"]
+
+
+def synthetic_context(cf_models=60, wd_models=20, crf_models=40, month="2026-10", seed=0):
+    """Planning context with generated model registries, BOM and plans for one month."""
+    rng = np.random.default_rng(seed)
+    ctx = default_context()
+    ctx["cf_models"] = [f"CF-Model-{i:03d}" for i in range(cf_models)]
+    ctx["wd_models"] = [f"WD-Model-{i:03d}" for i in range(wd_models)]
+    ctx["crf_models"] = [f"CRF-Part-{i:03d}" for i in range(crf_models)]
+    models = ctx["crf_models"] + ctx["cf_models"] + ctx["wd_models"]
+    ctx["active_models"] = {m: True for m in models}
+    ctx["plan_data"] = {m: {'monthly': 0, 'daily': 0} for m in models}
+
+    year, mon = int(month[:4]), int(month[5:7])
+    days = calendar.monthrange(year, mon)[1]
+    monthly = rng.integers(200, 3000, size=len(models))
+    ctx["monthly_plans"] = {month: {m: int(q) for m, q in zip(models, monthly)}}
+    # every CF model consumes 2-5 CRF parts, 1-4 of each per unit
+    ctx["bom"] = [
+        {"model": model, "part": part, "qty": float(rng.integers(1, 5))}
+        for model in ctx["cf_models"]
+        for part in rng.choice(ctx["crf_models"], size=int(rng.integers(2, 6)), replace=False)
+    ]
+    ctx["daily_plans"] = {
+        f"{month}-{d:02d}": {m: int(q // days) for m, q in zip(models, monthly)}
+        for d in range(1, days + 1)
+    }
+    # capacity tight enough that the chain scheduler has to share it
+    ctx["line_capacity"] = {"Pre-Assembly": 400, "Cabinet Foaming": 380, "Door Foaming": 380, "CF Final Line": 360}
+    ctx["wip_buffer"] = 600
+    return ctx
+
+
+def synthetic_records(n, ctx, month="2026-10", seed=0):
+    """n production records spread over the month, as dicts with the store's logical columns."""
+    rng = np.random.default_rng(seed)
+    year, mon = int(month[:4]), int(month[5:7])
+    days = calendar.monthrange(year, mon)[1]
+    areas = CF_AREAS + WD_AREAS
+    # Final lines and pre-assembly log more often than foaming stations
+    weights = np.array([0.18, 0.2, 0.12, 0.12, 0.22, 0.16])
+    area_idx = rng.choice(len(areas), size=n, p=weights / weights.sum())
+    day = rng.integers(1, days + 1, size=n)
+    shift = rng.integers(0, len(SHIFT_ENDS), size=n)
+    qty = rng.integers(1, 60, size=n)
+    supervisor = rng.integers(0, 12, size=n)
+    pick = rng.random(n)
+
+    registries = {
+        "CRF": (ctx["crf_models"], "CRF Parts", "CRF_PARTS"),
+        "WD Final Line": (ctx["wd_models"], "Water Dispenser", "WD"),
+    }
+    records = []
+    for i in range(n):
+        area = areas[area_idx[i]]
+        models, category, product = registries.get(area, (ctx["cf_models"], "Chest Freezer", "CF"))
+        records.append({
+            "Date": f"{month}-{day[i]:02d} {SHIFT_ENDS[shift[i]]}",
+            "Area": area,
+            "Supervisor": f"Supervisor-{supervisor[i]}",
+            "Category": category,
+            "Model": models[int(pick[i] * len(models))],
+            "Actual": int(qty[i]),
+            "Product": product,
+        })
+    return records
@@ -0,0 +1,130 @@
+# Bill of materials: CRF parts per CF model
+#
+# The "bom" setting lists how many of each CRF part one CF model consumes.
+# SparseBOM compresses it to a CF model x CRF part matrix (sorted by part, CSC
+# style) so exploding any demand matrix (models x days) into part demand is one
+# vectorized sparse multiply, however many models, parts and days there are.
+# part_coverage compares that demand with what the CRF area produced.
+import numpy as np
+import pandas as pd
+
+from plans import PlanMatrix
+
+BOM_COLUMNS = ["CF Model", "CRF Part", "Qty per Unit"]
+COVERAGE_COLUMNS = [
+    "Part", "Planned Demand (Month)", "Consumed (CF Final Line)", "CRF Actual",
+    "Net Available", "Daily Demand", "Coverage Days",
+]
+
+
+def bom_frame(entries):
+    """Saved bom entries ({"model", "part", "qty"}) as an editable table."""
+    return pd.DataFrame(
+        [[e["model"], e["part"], e["qty"]] for e in entries],
+        columns=BOM_COLUMNS,
+    ).astype({"Qty per Unit": "float64"})
+
+
+def bom_entries(table):
+    """Rows of an edited BOM table as saveable entries; returns (entries, problems).
+
+    Rows missing a model or part, or without a positive quantity, are reported
+    in problems and left out. A repeated (model, part) pair keeps its last row.
+    """
+    entries = {}
+    problems = []
+    for pos, (model, part, qty) in enumerate(table[BOM_COLUMNS].itertuples(index=False), start=1):
+        if pd.isna(model) or pd.isna(part) or model == "" or part == "":
+            problems.append(f"row {pos}: model and part are required")
+            continue
+        qty = pd.to_numeric(qty, errors="coerce")
+        if pd.isna(qty) or qty <= 0:
+            problems.append(f"row {pos}: quantity per unit must be positive")
+            continue
+        entries[(model, part)] = {"model": model, "part": part, "qty": float(qty)}
+    return list(entries.values()), problems
+
+
+class SparseBOM:
+    """CF model x CRF part quantities held as sorted coordinate arrays.
+
+    rows / cols / data list the non-zero entries ordered by part, and
+    indptr[p]:indptr[p + 1] is the slice belonging to part p.
+    """
+
+    def __init__(self, entries, models, parts):
+        self.models = list(models)
+        self.parts = list(parts)
+        model_index = {m: i for i, m in enumerate(self.models)}
+        part_index = {p: j for j, p in enumerate(self.parts)}
+        known = [e for e in entries if e["model"] in model_index and e["part"] in part_index and e["qty"] > 0]
+        rows = np.array([model_index[e["model"]] for e in known], dtype="int64")
+        cols = np.array([part_index[e["part"]] for e in known], dtype="int64")
+        data = np.array([e["qty"] for e in known], dtype="float64")
+        order = np.lexsort((rows, cols))
+        self.rows, self.cols, self.data = rows[order], cols[order], data[order]
+        self.indptr = np.searchsorted(self.cols, np.arange(len(self.parts) + 1))
+
+    @property
+    def nnz(self):
+        return len(self.data)
+
+    def explode(self, demand):
+        """Part demand for model demand: BOM^T @ demand.
+
+        demand is a vector over models or a models x periods matrix (NaN counts
+        as 0); the result has parts in place of models.
+        """
+        demand = np.nan_to_num(np.asarray(demand, dtype="float64"))
+        vector = demand.ndim == 1
+        if vector:
+            demand = demand[:, None]
+        out = np.zeros((len(self.parts), demand.shape[1]))
+        if self.nnz:
+            contributions = self.data[:, None] * demand[self.rows]
+            starts = self.indptr[:-1]
+            used = self.indptr[1:] > starts
+            # entries are sorted by part, so each used part's contributions are one contiguous run
+            out[used] = np.add.reduceat(contributions, starts[used], axis=0)
+        return out[:, 0] if vector else out
+
+
+def part_coverage(cube, ctx, date_str):
+    """CRF part demand vs CRF output for the month up to date_str, or None without a BOM.
+
+    Planned Demand explodes the month's CF plan; Consumed explodes CF Final
+    Line output month to date; Net Available is CRF output minus that
+    consumption, and Coverage Days divides it by the average planned daily
+    part demand over the month's working days.
+    """
+    if not ctx["bom"]:
+        return None
+    cf_models = list(ctx["cf_models"])
+    parts = list(ctx["crf_models"])
+    bom = SparseBOM(ctx["bom"], cf_models, parts)
+    if not bom.nnz:
+        return None
+    month_from = f"{date_str[:7]}-01"
+
+    plans = PlanMatrix(ctx, date_str[:7], cf_models)
+    daily_demand = bom.explode(plans.daily)
+    planned = daily_demand.sum(axis=1)
+    working = plans.working if plans.working.any() else np.ones_like(plans.working)
+    per_day = daily_demand[:, working].mean(axis=1)
+
+    final_line = cube.prefix.model_totals(month_from, date_str, "CF Final Line", cf_models)
+    consumed = bom.explode(final_line)
+    produced = cube.prefix.model_totals(month_from, date_str, "CRF", parts)
+    net = produced - consumed
+    with np.errstate(divide="ignore", invalid="ignore"):
+        coverage = np.where(per_day > 0, net / per_day, np.nan)
+
+    return pd.DataFrame({
+        "Part": parts,
+        "Planned Demand (Month)": planned,
+        "Consumed (CF Final Line)": consumed,
+        "CRF Actual": produced.astype("int64"),
+        "Net Available": net,
+        "Daily Demand": per_day,
+        "Coverage Days": coverage,
+    })[COVERAGE_COLUMNS]
@@ -0,0 +1,159 @@
+# Hour and shift buckets of production, polled incrementally
+#
+# Every record carries its submission time to the minute ("YYYY-MM-DD HH:MM").
+# HourlyBuckets sums Actual per day, area and model into 24 hourly buckets, and
+# shift totals are read from those hours. It polls the store by record id: the
+# first poll loads the days from `since` on, every later poll reads only the
+# records committed after the last id it saw. A refresh therefore costs the
+# same however long the history is, which is what the live andon board needs.
+import threading
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from context import DIVISIONS
+from plans import period_plan_total
+
+# Shift name and start hour; each shift runs until the next one starts (the last wraps past midnight)
+SHIFTS = [("A", 6), ("B", 14), ("C", 22)]
+HOURS = list(range(24))
+ANDON_COLUMNS = ["Area", "Plan (Day)", "Due Now", "Today", "This Shift", "This Hour", "Gap"]
+
+
+def shift_of_hour(hour):
+    """Index into SHIFTS of the shift working at hour (0-23)."""
+    current = len(SHIFTS) - 1
+    for i, (_name, start) in enumerate(SHIFTS):
+        if hour >= start:
+            current = i
+    return current
+
+
+def shift_hours(day, shift):
+    """(day, hour) cells of a shift that starts on day, following it past midnight."""
+    start = SHIFTS[shift][1]
+    end = SHIFTS[(shift + 1) % len(SHIFTS)][1]
+    length = (end - start) % 24 or 24
+    first = date.fromisoformat(day)
+    cells = []
+    for offset in range(length):
+        hour = start + offset
+        cells.append(((first + timedelta(days=hour // 24)).isoformat(), hour % 24))
+    return cells
+
+
+def current_shift(now):
+    """(shift index, day the shift started) for a datetime."""
+    shift = shift_of_hour(now.hour)
+    day = now.date()
+    if now.hour < SHIFTS[shift][1]:
+        # after midnight in the shift that started the day before
+        day -= timedelta(days=1)
+    return shift, day.isoformat()
+
+
+class HourlyBuckets:
+    """Actual per day -> (area, model) -> 24 hourly totals, advanced by record id.
+
+    One instance is shared by every andon screen of a plant; poll() and
+    forget_before() change the buckets under the lock and the readers copy
+    them out under the same lock.
+    """
+
+    def __init__(self, since):
+        self.since = since
+        self.last_id = None
+        self._days = {}
+        self._lock = threading.Lock()
+
+    def poll(self, store):
+        """Fold in records committed since the last poll; returns how many were read."""
+        with self._lock:
+            if self.last_id is None:
+                # first poll: only the window's days, then everything committed after this id
+                top = store.last_id()
+                rows = store.query(date_from=self.since)
+                rows = rows[rows["id"] <= top]
+                self.last_id = top
+            else:
+                rows = store.rows_since(self.last_id)
+                if not rows.empty:
+                    self.last_id = int(rows["id"].iloc[-1])
+            rows = rows[rows["Report_Date"] >= self.since]
+            if not rows.empty:
+                self._add(rows)
+            return len(rows)
+
+    def forget_before(self, day):
+        """Drop the buckets of days before day (the board only looks back one shift)."""
+        with self._lock:
+            self.since = max(self.since, day)
+            for old in [d for d in self._days if d < day]:
+                del self._days[old]
+
+    def _add(self, rows):
+        hour = rows["Date"].str.slice(11, 13).astype("int64")
+        sums = rows.groupby([rows["Report_Date"], hour.rename("Hour"), rows["Area"], rows["Model"]])["Actual"].sum()
+        for (day, h, area, model), actual in sums.items():
+            buckets = self._days.setdefault(day, {})
+            cell = buckets.get((area, model))
+            if cell is None:
+                cell = buckets[(area, model)] = np.zeros(24, dtype="int64")
+            cell[h] += int(actual)
+
+    def hourly(self, day, area=None):
+        """Hours x areas (or x models of one area) Actual for a day."""
+        totals = {}
+        with self._lock:
+            for (a, model), cell in self._days.get(day, {}).items():
+                if area is None or a == area:
+                    key = a if area is None else model
+                    totals[key] = totals.get(key, 0) + cell
+        return pd.DataFrame({key: totals[key] for key in sorted(totals)}, index=pd.Index(HOURS, name="Hour"), dtype="int64")
+
+    def cells_total(self, cells, area=None):
+        """Actual per area (or per model of one area) over (day, hour) cells, as a Series."""
+        totals = {}
+        with self._lock:
+            for day, hour in cells:
+                for (a, model), cell in self._days.get(day, {}).items():
+                    if area is None or a == area:
+                        key = a if area is None else model
+                        totals[key] = totals.get(key, 0) + int(cell[hour])
+        return pd.Series(totals, dtype="int64")
+
+    def shift_totals(self, day, area=None):
+        """Areas (or models of one area) x shifts Actual for the shifts starting on day."""
+        columns = {name: self.cells_total(shift_hours(day, i), area) for i, (name, _start) in enumerate(SHIFTS)}
+        return pd.DataFrame(columns).fillna(0).astype("int64").sort_index()
+
+
+def andon_board(buckets, ctx, now, areas):
+    """Live figures per area at now: today's daily plan (the area's division plan), the share
+    of it due by now (even over 24 hours), and Actual today, this shift and this hour."""
+    today = now.strftime("%Y-%m-%d")
+    shift, shift_day = current_shift(now)
+    hourly = buckets.hourly(today)
+    this_shift = buckets.cells_total(shift_hours(shift_day, shift))
+    elapsed = (now.hour * 60 + now.minute) / (24 * 60)
+    rows = []
+    for division_areas, registry in DIVISIONS.values():
+        shown = [a for a in division_areas if a in areas]
+        if not shown:
+            continue
+        models = [m for m in ctx[registry] if ctx["active_models"].get(m, True)]
+        plan = period_plan_total(ctx, models, today, today)
+        for area in shown:
+            done = int(hourly[area].sum()) if area in hourly else 0
+            due = np.nan if np.isnan(plan) else plan * elapsed
+            rows.append({
+                "Area": area,
+                "Plan (Day)": plan,
+                "Due Now": due,
+                "Today": done,
+                "This Shift": int(this_shift.get(area, 0)),
+                "This Hour": int(hourly.at[now.hour, area]) if area in hourly else 0,
+                "Gap": np.nan if np.isnan(due) else done - due,
+            })
+    return pd.DataFrame(rows, columns=ANDON_COLUMNS)
@@ -0,0 +1,157 @@
+# Headless report runner
+#
+#   python cli.py wip --from 2026-10-01 --to 2026-10-31 --division "CF Assembly Division" --out reports/
+#   python cli.py daily --from 2026-10-15 --area "CF Final Line"
+#   python cli.py monthly --month 2026-09 --to 2026-10 --format json
+#   python cli.py coverage --from 2026-10-15
+#   python cli.py compact                      (nightly: archive closed months)
+#   python cli.py rehydrate --month 2026-06 --out audit/
+#
+# Reads the same store (--plant's, or --db) and saved plans/models as the app,
+# builds the rollup once, and runs the engine for every date or month in the
+# range. Each report goes to stdout or to one file per date under --out.
+# compact / rehydrate manage the closed-month archive (see archive.py).
+import argparse
+import os
+import sys
+from datetime import date, timedelta
+
+from archive import CLOSE_AFTER_DAYS, compact_closed, rehydrate, restore_month
+from bom import part_coverage
+from context import ALL_AREAS, DIVISIONS, load_context, plant_db_path, plant_names
+from engine import daily_achievement, monthly_report, wip_grid
+from frame import ProductionFrame
+from rollup import RollupCube
+from store import ProductionStore
+
+
+def date_range(start, end):
+    day = date.fromisoformat(start)
+    last = date.fromisoformat(end or start)
+    while day <= last:
+        yield day.isoformat()
+        day += timedelta(days=1)
+
+
+def month_range(start, end):
+    year, month = int(start[:4]), int(start[5:7])
+    end = end or start
+    last = (int(end[:4]), int(end[5:7]))
+    while (year, month) <= last:
+        yield f"{year:04d}-{month:02d}"
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def build_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--plant", choices=plant_names(), default=plant_names()[0], help="plant whose store is read")
+    common.add_argument("--db", help="production store file (default: the plant's)")
+    common.add_argument("--out", help="directory for one file per report (default: stdout)")
+    common.add_argument("--format", choices=["csv", "json"], default="csv")
+
+    parser = argparse.ArgumentParser(description="Generate Plan vs Actual reports without the Streamlit UI.")
+    sub = parser.add_subparsers(dest="report", required=True)
+
+    wip = sub.add_parser("wip", parents=[common], help="WIP grid per day")
+    wip.add_argument("--from", dest="start", required=True, help="first date (YYYY-MM-DD)")
+    wip.add_argument("--to", dest="end", help="last date (default: --from)")
+    wip.add_argument("--division", choices=list(DIVISIONS), default="CF Assembly Division")
+
+    daily = sub.add_parser("daily", parents=[common], help="Daily Achievement per day")
+    daily.add_argument("--from", dest="start", required=True, help="first date (YYYY-MM-DD)")
+    daily.add_argument("--to", dest="end", help="last date (default: --from)")
+    daily.add_argument("--area", choices=["All"] + ALL_AREAS, default="All")
+
+    monthly = sub.add_parser("monthly", parents=[common], help="Monthly Plan vs Actual per month")
+    monthly.add_argument("--month", dest="start", required=True, help="first month (YYYY-MM)")
+    monthly.add_argument("--to", dest="end", help="last month (default: --month)")
+    monthly.add_argument("--area", choices=["All"] + ALL_AREAS, default="All")
+    monthly.add_argument("--as-of", default=date.today().isoformat(), help="run-rate forecast date (default: today)")
+
+    coverage = sub.add_parser("coverage", parents=[common], help="CRF part coverage, month to date through each day")
+    coverage.add_argument("--from", dest="start", required=True, help="first date (YYYY-MM-DD)")
+    coverage.add_argument("--to", dest="end", help="last date (default: --from)")
+
+    compact = sub.add_parser("compact", parents=[common], help="archive closed months into Parquet summaries")
+    compact.add_argument("--as-of", default=date.today().isoformat(), help="date months are closed against (default: today)")
+    compact.add_argument("--close-after-days", type=int, default=CLOSE_AFTER_DAYS,
+                         help="days after a month's end before it is archived")
+
+    hydrate = sub.add_parser("rehydrate", parents=[common], help="raw records of an archived month (audits)")
+    hydrate.add_argument("--month", required=True, help="archived month (YYYY-MM)")
+    hydrate.add_argument("--restore", action="store_true", help="move the records back into the live store")
+    return parser
+
+
+def run_archive(args, store):
+    if args.report == "compact":
+        moved = compact_closed(store, args.as_of, args.close_after_days)
+        for month, records in moved.items():
+            print(f"{month}: {records} record(s) archived", file=sys.stderr)
+        print(f"{len(moved)} month(s) compacted", file=sys.stderr)
+        return 0
+    if args.restore:
+        print(f"{args.month}: {restore_month(store, args.month)} record(s) restored", file=sys.stderr)
+        return 0
+    records = rehydrate(store, args.month)
+    if records is None:
+        print(f"{args.month}: not archived", file=sys.stderr)
+        return 1
+    text = records.to_csv(index=False) if args.format == "csv" else records.to_json(orient="records", indent=2)
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+        with open(os.path.join(args.out, f"records_{args.month}.{args.format}"), "w") as f:
+            f.write(text)
+    else:
+        print(text)
+    print(f"{args.month}: {len(records)} record(s) rehydrated", file=sys.stderr)
+    return 0
+
+
+def run_reports(args, cube, ctx):
+    """Yield (label, DataFrame or None) for every date/month requested."""
+    if args.report == "wip":
+        for day in date_range(args.start, args.end):
+            yield f"wip_{args.division.split()[0].lower()}_{day}", wip_grid(cube, ctx, day, args.division)
+    elif args.report == "daily":
+        for day in date_range(args.start, args.end):
+            yield f"daily_{args.area.replace(' ', '_').lower()}_{day}", daily_achievement(cube, ctx, day, args.area)
+    elif args.report == "coverage":
+        for day in date_range(args.start, args.end):
+            yield f"coverage_{day}", part_coverage(cube, ctx, day)
+    else:
+        for month in month_range(args.start, args.end):
+            yield f"monthly_{args.area.replace(' ', '_').lower()}_{month}", monthly_report(cube, ctx, month, args.area, as_of=args.as_of)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    store = ProductionStore(args.db or plant_db_path(args.plant))
+    if args.report in ("compact", "rehydrate"):
+        return run_archive(args, store)
+    production = ProductionFrame()
+    production.sync(store)
+    cube = RollupCube().sync(production)
+    ctx = load_context(store)
+
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+    written = 0
+    for label, df in run_reports(args, cube, ctx):
+        if df is None:
+            print(f"{label}: no production data" if args.report != "coverage" else f"{label}: no bill of materials", file=sys.stderr)
+            continue
+        text = df.to_csv(index=False) if args.format == "csv" else df.to_json(orient="records", indent=2)
+        if args.out:
+            with open(os.path.join(args.out, f"{label}.{args.format}"), "w") as f:
+                f.write(text)
+        else:
+            print(f"# {label}")
+            print(text)
+        written += 1
+    print(f"{written} report(s) written", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
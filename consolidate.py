@@ -0,0 +1,126 @@
+# Consolidated plan vs actual and WIP across plants
+#
+# Each plant's partition (its own store file with its records, plans and model
+# registries) is reported by plant_reports in a separate process, so plants are
+# computed in parallel across cores. Those are fresh interpreters running this
+# file (not forks of the multithreaded app server, which could inherit a lock
+# held at fork time, nor pool workers, which would re-run the Streamlit script
+# as their __main__), bounded by a deadline. A worker reads only the days
+# the reports need from its plant's store, never the whole history. The
+# per-plant tables are then merged here: detail rows tagged with their plant,
+# totals per plant and per model, and WIP grids summed by production area.
+import pickle
+import subprocess
+import sys
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from context import DIVISIONS, load_context
+from engine import FORECAST_COLUMNS, RUN_RATE_WINDOWS, monthly_report, wip_grid
+from frame import ProductionFrame
+from plans import month_days
+from rollup import RollupCube
+from store import ProductionStore
+
+TOTAL_COLUMNS = ["Planned Qty", "Actual Qty", "Variance"] + FORECAST_COLUMNS
+
+# Seconds the plant processes of one consolidated report may take in total
+PLANT_TIMEOUT = 120
+
+
+def plant_reports(plant, db_path, date_str):
+    """Monthly report (with run-rate forecast) and day WIP grids of one plant, as of date_str."""
+    store = ProductionStore(db_path)
+    month = date_str[:7]
+    # the forecast's longest window may reach back into the previous month
+    first = min(f"{month}-01", (date.fromisoformat(date_str) - timedelta(days=max(RUN_RATE_WINDOWS) - 1)).isoformat())
+    production = ProductionFrame().load_window(store, first, month_days(month)[-1])
+    cube = RollupCube().sync(production)
+    ctx = load_context(store)
+    return {
+        "plant": plant,
+        "monthly": monthly_report(cube, ctx, month, "All", as_of=date_str),
+        "wip": {division: wip_grid(cube, ctx, date_str, division) for division in DIVISIONS},
+    }
+
+
+def _tagged(plant, df):
+    df = df.copy()
+    df.insert(0, "Plant", plant)
+    return df
+
+
+def merge_monthly(results):
+    """(detail, by plant, by model) of the plants' monthly reports, or None when no plant has production."""
+    frames = [_tagged(r["plant"], r["monthly"]) for r in results if r["monthly"] is not None]
+    if not frames:
+        return None
+    detail = pd.concat(frames, ignore_index=True)
+    by_plant = detail.groupby("Plant", sort=False)[TOTAL_COLUMNS].sum().reset_index()
+    by_model = detail.groupby("Model", sort=True).agg(
+        Plants=("Plant", "nunique"), **{c: (c, "sum") for c in TOTAL_COLUMNS}
+    ).reset_index()
+    return detail, by_plant, by_model
+
+
+def merge_wip(results):
+    """{division: (summed grid, per-plant rows)} over plants with production that day."""
+    merged = {}
+    for division in DIVISIONS:
+        frames = [_tagged(r["plant"], r["wip"][division]) for r in results if r["wip"][division] is not None]
+        if not frames:
+            continue
+        detail = pd.concat(frames, ignore_index=True)
+        value_columns = list(detail.columns[2:])
+        # a plan is N/A only when no plant has one
+        total = detail.groupby("Production Area", sort=False)[value_columns].sum(min_count=1)
+        act_column = value_columns[-1]
+        total[act_column] = total[act_column].fillna(0).astype(np.int64)
+        merged[division] = (total.reset_index(), detail)
+    return merged
+
+
+def _run_plant_processes(names, paths, date_str, timeout):
+    procs = [subprocess.Popen([sys.executable, __file__, name, path, date_str],
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+             for name, path in zip(names, paths)]
+    deadline = time.monotonic() + timeout
+    try:
+        results = []
+        for name, proc in zip(names, procs):
+            out, err = proc.communicate(timeout=max(deadline - time.monotonic(), 0.1))
+            if proc.returncode != 0:
+                raise RuntimeError(f"{name} report failed: {err.decode(errors='replace').strip().splitlines()[-1:]}")
+            results.append(pickle.loads(out))
+        return results
+    except subprocess.TimeoutExpired:
+        raise TimeoutError(f"plant reports did not finish within {timeout} s") from None
+    finally:
+        for proc in procs:
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+
+
+def consolidated_report(plants, date_str, parallel=False, timeout=PLANT_TIMEOUT):
+    """Monthly and WIP reports of every plant ({plant: db_path}) as of date_str, merged.
+
+    With parallel, each plant is computed in its own process (all within timeout
+    seconds, else TimeoutError); otherwise one after another in this process.
+    Returns (monthly, wip) as merge_monthly / merge_wip do.
+    """
+    names = list(plants)
+    paths = [plants[name] for name in names]
+    if parallel:
+        results = _run_plant_processes(names, paths, date_str, timeout)
+    else:
+        results = [plant_reports(name, path, date_str) for name, path in zip(names, paths)]
+    return merge_monthly(results), merge_wip(results)
+
+
+if __name__ == "__main__":
+    # plant process: python consolidate.py <plant> <db_path> <date>; pickled result on stdout
+    sys.stdout.buffer.write(pickle.dumps(plant_reports(*sys.argv[1:4])))
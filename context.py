@@ -0,0 +1,93 @@
+# Plants, plant areas and the saved planning context
+#
+# Plain data and the store's settings only (no pandas / NumPy), so the app can
+# start, and serve the Production Entry forms, before any report module loads.
+# Every plant is its own partition: one store file holding its production
+# records and its settings (model registries, plans, calendar, ...).
+import os
+import re
+
+# Plant served when PLANTS is not set; its store is PRODUCTION_DB as before
+DEFAULT_PLANT = "Waghodia"
+
+# CF Area configuration (explicit)
+CF_AREAS = ["CRF", "Pre-Assembly", "Cabinet Foaming", "Door Foaming", "CF Final Line"]
+WD_AREAS = ["WD Final Line"]
+ALL_AREAS = CF_AREAS + WD_AREAS
+
+# WIP divisions: areas shown and the model registry they draw from
+DIVISIONS = {
+    "CRF Division": (["CRF"], "crf_models"),
+    # CF Assembly division (Pre-Assembly, Cabinet Foaming, Door Foaming, CF Final Line)
+    "CF Assembly Division": (["Pre-Assembly", "Cabinet Foaming", "Door Foaming", "CF Final Line"], "cf_models"),
+    "WD Division": (["WD Final Line"], "wd_models"),
+}
+
+def plant_names():
+    """Plants of this deployment (PLANTS="Waghodia,Pune"); the first one is the default."""
+    names = [name.strip() for name in os.environ.get("PLANTS", DEFAULT_PLANT).split(",") if name.strip()]
+    return names or [DEFAULT_PLANT]
+
+
+def plant_db_path(plant):
+    """Store file of a plant: PRODUCTION_DB for the default plant, production_<plant>.db beside it for the others."""
+    base = os.environ.get("PRODUCTION_DB", "production.db")
+    if plant == plant_names()[0]:
+        return base
+    root, ext = os.path.splitext(base)
+    slug = re.sub(r"[^a-z0-9]+", "_", plant.lower()).strip("_")
+    return f"{root}_{slug}{ext or '.db'}"
+
+
+# Persisted as the "plant_calendar" setting; weekday numbers are Monday=0 .. Sunday=6
+DEFAULT_CALENDAR = {"weekly_off": [], "holidays": []}
+
+# Keys of the planning context that are persisted in the store
+CONTEXT_KEYS = [
+    "categories", "cf_models", "wd_models", "crf_models", "crf_categories",
+    "active_models", "plan_data", "monthly_plans", "daily_plans", "plant_calendar", "bom",
+    "line_capacity", "wip_buffer",
+]
+# The model registries: all Production Entry needs; plans and the rest load when a page uses them
+REGISTRY_KEYS = ["categories", "cf_models", "wd_models", "crf_models", "crf_categories", "active_models"]
+
+
+def default_context():
+    ctx = {
+        # Two main product categories (top-level)
+        "categories": ["Chest Freezer", "Water Dispenser"],
+        # Models for Chest Freezer assembly flow (used in Pre-assembly, Cabinet Foaming, Door Foaming, CF Final Line)
+        "cf_models": ["CF-Model-100", "CF-Model-200"],
+        # Models for Water Dispenser (independent)
+        "wd_models": ["WD-Model-A", "WD-Model-B"],
+        # CRF (parts) are separate — they produce parts required by CF assembly. CRF has its own models/categories.
+        "crf_models": ["CRF-Part-A", "CRF-Part-B"],
+        "crf_categories": ["CRF Parts"],
+        # monthly/daily plans keyed by YYYY-MM and YYYY-MM-DD
+        "monthly_plans": {},
+        "daily_plans": {},
+        # weekly off days and holidays the monthly plan is not phased onto
+        "plant_calendar": {k: list(v) for k, v in DEFAULT_CALENDAR.items()},
+        # CRF parts consumed per CF model unit: [{"model", "part", "qty"}]
+        "bom": [],
+        # CF chain units/day per area and max units waiting in front of a stage (0 = unlimited)
+        "line_capacity": {},
+        "wip_buffer": 0,
+    }
+    all_models = ctx["crf_models"] + ctx["cf_models"] + ctx["wd_models"]
+    # activation flags for models (works across all model sets)
+    ctx["active_models"] = {m: True for m in all_models}
+    # plan_data default storage (backwards-compatible)
+    ctx["plan_data"] = {m: {'monthly': 0, 'daily': 0} for m in all_models}
+    return ctx
+
+
+def load_context(store, keys=None):
+    """Planning context saved in the store, with defaults for anything never saved.
+
+    With keys, only those settings are read (and returned).
+    """
+    keys = CONTEXT_KEYS if keys is None else list(keys)
+    ctx = {k: v for k, v in default_context().items() if k in keys}
+    ctx.update({k: v for k, v in store.load_config(keys).items() if k in CONTEXT_KEYS})
+    return ctx
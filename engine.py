@@ -0,0 +1,243 @@
+# Planning / reporting engine
+#
+# Pure functions over pre-aggregated production cells (see rollup.py) and a
+# planning context: any mapping with the model registries and plans under the
+# same keys the app keeps in st.session_state (cf_models, monthly_plans, ...).
+# The Streamlit script only renders what these return; cli.py runs them headless.
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from context import ALL_AREAS, DIVISIONS
+from plans import PlanMatrix, month_days, period_plan_total, working_day_count
+
+# Area whose output counts as a finished unit for each product family
+FINAL_LINE_AREA = {"WD": "WD Final Line", "CF": "CF Final Line", "CRF": "CRF"}
+
+# Trailing windows (days) of the month-end run-rate forecast; Projected Variance uses FORECAST_BASIS
+RUN_RATE_WINDOWS = (3, 7, 14)
+FORECAST_BASIS = 7
+FORECAST_COLUMNS = [f"Forecast ({w}d)" for w in RUN_RATE_WINDOWS] + [f"Projected Variance ({FORECAST_BASIS}d)"]
+
+WIP_COLUMNS = ["Production Area", "Plan (Monthly)", "Plan (Day)", "Act (Day)"]
+WIP_PERIOD_COLUMNS = ["Production Area", "Plan (Monthly)", "Plan (Period)", "Act (Period)"]
+DAILY_COLUMNS = ["Model", "Area", "Act", "Plan", "Achievement %"]
+MONTHLY_COLUMNS = ["Model", "Category", "Planned Qty", "Actual Qty", "Variance"]
+
+def all_models(ctx):
+    return sorted(set(list(ctx["crf_models"]) + list(ctx["cf_models"]) + list(ctx["wd_models"])))
+
+
+def division_models(ctx, division):
+    areas, registry = DIVISIONS[division]
+    return areas, [m for m in ctx[registry] if ctx["active_models"].get(m, True)]
+
+
+def model_family(models, wd_models, cf_models, crf_models):
+    """Product family per model; WD wins over CF over CRF when a name is in several lists."""
+    wd, cf, crf = set(wd_models), set(cf_models), set(crf_models)
+    return pd.Series(
+        ["WD" if m in wd else "CF" if m in cf else "CRF" if m in crf else None for m in models],
+        index=pd.Index(models, name="Model"),
+        dtype=object,
+    )
+
+
+def monthly_plan_vs_actual(month_cells, all_models, wd_models, cf_models, crf_models, monthly_plans_for_month, plan_data):
+    """Monthly Plan vs Actual table for all_models in one grouped pass.
+
+    month_cells holds the month's production (already area-filtered) with Model,
+    Area, Actual and Category columns; rows are either raw records or rollup
+    cells carrying First_Id. Actual Qty prefers the family's final-line output and
+    falls back to the all-area total when that is zero. Rows with neither plan nor
+    actual are dropped, keeping the position index of the full model list.
+    """
+    models = pd.Index(all_models, name="Model")
+    family = model_family(models, wd_models, cf_models, crf_models)
+    final_area = family.map(FINAL_LINE_AREA)
+
+    cells = month_cells
+    if "First_Id" in cells.columns:
+        cells = cells.sort_values("First_Id", kind="stable")
+    cell_models = cells["Model"]
+
+    all_area = cells.groupby("Model", sort=False)["Actual"].sum()
+    on_final = cells["Area"].to_numpy() == cell_models.map(final_area).to_numpy()
+    final = cells[on_final].groupby("Model", sort=False)["Actual"].sum()
+    all_area = all_area.reindex(models, fill_value=0).to_numpy()
+    final = final.reindex(models, fill_value=0).to_numpy()
+    actual = np.where(final != 0, final, all_area).astype("int64")
+
+    first = cells.drop_duplicates("Model").set_index("Model")["Category"]
+    category = first.reindex(models)
+    category = category.where(models.isin(first.index), "N/A")
+
+    planned = np.array(
+        [int(monthly_plans_for_month.get(m, plan_data.get(m, {}).get('monthly', 0)) or 0) for m in models],
+        dtype="int64",
+    )
+
+    report_df = pd.DataFrame({
+        "Model": models.to_numpy(dtype=object),
+        "Category": category.to_numpy(dtype=object),
+        "Planned Qty": planned,
+        "Actual Qty": actual,
+        "Variance": actual - planned,
+    })
+    return report_df[(report_df['Planned Qty'] != 0) | (report_df['Actual Qty'] != 0)]
+
+
+def wip_grid(cube, ctx, date_str, division):
+    """WIP grid for one day and division, or None when the division has no production that day.
+
+    CRF / WD list their area; CF Assembly interleaves WIP rows between
+    consecutive areas (Plan and Act differences). Plan (Day) is the day's
+    daily plan, or its share of the monthly plan phased over working days.
+    """
+    display_areas, models_in_div = division_models(ctx, division)
+    if cube.day(date_str, areas=display_areas).empty:
+        return None
+
+    plans = PlanMatrix(ctx, date_str[:7], models_in_div)
+    plan = (plans.monthly_total(models_in_div), plans.period_total(date_str, date_str, models_in_div))
+    area_actual = {area: int(cube.area_total(date_str, area)) for area in display_areas}
+    return pd.DataFrame(_wip_rows(division, display_areas, plan, area_actual), columns=WIP_COLUMNS)
+
+
+def _wip_rows(division, display_areas, plan, area_actual):
+    """[area, *plan, act] rows; the CF chain gets a WIP row between each pair of consecutive areas.
+
+    Every area of a division shares the same plan values, so plan WIP is always 0.
+    """
+    rows = []
+    if division in ("CRF Division", "WD Division"):
+        for area in display_areas:
+            rows.append([area, *plan, area_actual.get(area, 0)])
+    else:
+        seq = display_areas
+        plan_wip = [0.0] * len(plan)
+        rows.append([seq[0], *plan, area_actual.get(seq[0], 0)])
+        for i in range(len(seq) - 1):
+            a_from = seq[i]
+            a_to = seq[i + 1]
+            act_wip = area_actual.get(a_from, 0) - area_actual.get(a_to, 0)
+            rows.append([f"WIP ({a_from} → {a_to})", *plan_wip, act_wip])
+        rows.append([seq[-1], *plan, area_actual.get(seq[-1], 0)])
+    return rows
+
+
+def wip_period_grid(cube, ctx, date_from, date_to, division):
+    """WIP grid with Actual summed over [date_from, date_to] (e.g. month to date), or None without production.
+
+    Area totals come from the cube's prefix-sum index, so the cost does not
+    depend on the length of the range.
+    """
+    display_areas, models_in_div = division_models(ctx, division)
+    area_actual = {area: cube.prefix.area_total(date_from, date_to, area) for area in display_areas}
+    if not any(area_actual.values()):
+        return None
+    plan = (
+        PlanMatrix(ctx, date_to[:7], models_in_div).monthly_total(models_in_div),
+        period_plan_total(ctx, models_in_div, date_from, date_to),
+    )
+    return pd.DataFrame(_wip_rows(division, display_areas, plan, area_actual), columns=WIP_PERIOD_COLUMNS)
+
+
+def wip_trend(cube, ctx, date_from, date_to, division):
+    """Cumulative WIP from date_from through each day to date_to, one column per stage.
+
+    The CF chain has a column per pair of consecutive areas (units started
+    upstream but not yet through the next area); CRF / WD show their area's
+    cumulative output.
+    """
+    display_areas, _models = division_models(ctx, division)
+    series = {area: cube.prefix.area_series(date_from, date_to, area) for area in display_areas}
+    if len(display_areas) == 1:
+        trend = pd.DataFrame(series)
+    else:
+        trend = pd.DataFrame({
+            f"{a_from} → {a_to}": series[a_from] - series[a_to]
+            for a_from, a_to in zip(display_areas, display_areas[1:])
+        })
+    trend.index.name = "Date"
+    return trend
+
+
+def achievement_pct(act, plan):
+    """Achievement % per row: NaN without a plan, 0/100 for a zero plan, else act / plan * 100."""
+    act = np.asarray(act, dtype="float64")
+    plan = np.asarray(plan, dtype="float64")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = (act / plan) * 100.0
+    zero_plan = np.where(act == 0, 0.0, 100.0)
+    return np.where(np.isnan(plan), np.nan, np.where(plan == 0, zero_plan, ratio))
+
+
+def daily_achievement(cube, ctx, date_str, area="All"):
+    """Per (model, area) Act vs daily Plan for one date, or None when nothing was produced."""
+    cells = cube.day(date_str, areas=None if area == "All" else [area])
+    if cells.empty:
+        return None
+    # cube cells are already unique per (Model, Area) and ordered like the groupby
+    model_summary = cells[['Model', 'Area', 'Actual']].rename(columns={'Actual': 'Act'})
+    # only plans entered for this date count; NaN (shown as N/A) otherwise
+    plans = PlanMatrix(ctx, date_str[:7], model_summary['Model'].unique())
+    model_summary['Plan'] = plans.explicit_day(date_str)[plans.rows(model_summary['Model'])]
+    model_summary['Achievement %'] = achievement_pct(model_summary['Act'], model_summary['Plan'])
+    model_summary["Act"] = pd.to_numeric(model_summary["Act"], errors="coerce").fillna(0).astype(int)
+    return model_summary[DAILY_COLUMNS]
+
+
+def run_rate_forecast(cube, ctx, month_str, area, as_of, models):
+    """Projected month-end Actual per model from trailing run rates, as {column: array}.
+
+    Actual counts the same way as the Monthly Report (family final line, else
+    every area; only `area` when one is selected) through as_of, which is
+    clamped to the month. Each window's rate is its output per working day and
+    is carried over the working days left in the month.
+    """
+    days = month_days(month_str)
+    as_of = min(max(as_of, days[0]), days[-1])
+    areas = ALL_AREAS if area == "All" else [area]
+    family = model_family(pd.Index(models), ctx["wd_models"], ctx["cf_models"], ctx["crf_models"])
+    final_area = family.map(FINAL_LINE_AREA).to_numpy()
+    on_final = np.array([final_area == a for a in areas])
+
+    def actual(date_from, date_to):
+        totals = np.stack([cube.prefix.model_totals(date_from, date_to, a, models) for a in areas])
+        return (totals * on_final).sum(axis=0), totals.sum(axis=0)
+
+    final, total = actual(days[0], as_of)
+    use_final = final != 0
+    to_date = np.where(use_final, final, total)
+    remaining = working_day_count((date.fromisoformat(as_of) + timedelta(days=1)).isoformat(), days[-1], ctx["plant_calendar"])
+
+    forecast = {}
+    for window in RUN_RATE_WINDOWS:
+        start = (date.fromisoformat(as_of) - timedelta(days=window - 1)).isoformat()
+        final, total = actual(start, as_of)
+        rate = np.where(use_final, final, total) / max(working_day_count(start, as_of, ctx["plant_calendar"]), 1)
+        forecast[f"Forecast ({window}d)"] = np.round(to_date + rate * remaining).astype("int64")
+    return forecast
+
+
+def monthly_report(cube, ctx, month_str, area="All", as_of=None):
+    """Monthly Plan vs Actual for all models, or None when the month/area has no production.
+
+    With as_of (YYYY-MM-DD) the run-rate forecast columns are added.
+    """
+    cells = cube.month(month_str, areas=None if area == "All" else [area])
+    if cells.empty:
+        return None
+    models = all_models(ctx)
+    report_df = monthly_plan_vs_actual(
+        cells, models, ctx["wd_models"], ctx["cf_models"], ctx["crf_models"],
+        ctx["monthly_plans"].get(month_str, {}), ctx["plan_data"],
+    )
+    if as_of is None:
+        return report_df
+    rows = report_df.index.to_numpy()
+    forecast = {column: values[rows] for column, values in run_rate_forecast(cube, ctx, month_str, area, as_of, models).items()}
+    forecast[FORECAST_COLUMNS[-1]] = forecast[f"Forecast ({FORECAST_BASIS}d)"] - report_df["Planned Qty"].to_numpy()
+    return report_df.assign(**forecast)
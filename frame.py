@@ -0,0 +1,120 @@
+# Cached, typed production frame
+#
+# One DataFrame of the store's live production records with parsed datetime64
+# dates and precomputed Report_Date / Report_Month keys. It is shared by every
+# report tab and only grows: a rerun with an unchanged store version returns the
+# cached frame, and a new batch only parses the rows appended since the last
+# sync. Closed months compacted into the archive are not read back as rows; the
+# frame carries their day x area x model cells (`archived`) for the rollup cube.
+# Repeated strings (area, model, category, product, supervisor, day keys) are
+# held as integer codes into per-column registries (pandas categoricals) and
+# quantities as int32, so a row costs tens of bytes instead of hundreds.
+import threading
+
+import numpy as np
+import pandas as pd
+
+from archive import archived_cells
+
+FRAME_COLUMNS = ["id", "Date", "Report_Date", "Report_Month", "Area", "Supervisor", "Category", "Model", "Actual", "Product"]
+CODED_COLUMNS = ["Report_Date", "Report_Month", "Area", "Supervisor", "Category", "Model", "Product"]
+
+
+def type_rows(raw):
+    """Turn raw store rows (string timestamps) into the typed frame layout."""
+    df = raw.copy()
+    df["Date"] = pd.to_datetime(df["Date"], format="%Y-%m-%d %H:%M")
+    df["Report_Month"] = df["Report_Date"].str.slice(0, 7)
+    df["id"] = df["id"].astype("int64")
+    df["Actual"] = df["Actual"].astype("int32")
+    return df[FRAME_COLUMNS]
+
+
+class Registry:
+    """Append-only value -> code table for one column; existing codes never change."""
+
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+
+    def encode(self, values):
+        """int32 codes for values (-1 for missing), registering values not seen before."""
+        chunk_codes, uniques = pd.factorize(values)
+        lookup = np.empty(len(uniques), dtype="int32")
+        for i, value in enumerate(uniques):
+            code = self.codes.get(value)
+            if code is None:
+                code = self.codes[value] = len(self.values)
+                self.values.append(value)
+            lookup[i] = code
+        codes = np.full(len(chunk_codes), -1, dtype="int32")
+        present = chunk_codes >= 0
+        codes[present] = lookup[chunk_codes[present]]
+        return codes
+
+    def categories(self):
+        return pd.Index(self.values, dtype=object)
+
+
+class ProductionFrame:
+    """Incrementally maintained typed view over a ProductionStore."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.version = None
+        self.last_id = 0
+        self.registries = {column: Registry() for column in CODED_COLUMNS}
+        self.df = None
+        # cells of the archived months, read with the first sync
+        self.archived = None
+        self.df = self._combine(type_rows(pd.DataFrame(columns=[c for c in FRAME_COLUMNS if c != "Report_Month"])))
+
+    def sync(self, store):
+        """Bring the frame up to the store's current version and return it."""
+        version = store.version()
+        if version == self.version:
+            return self.df
+        with self._lock:
+            if version != self.version:
+                if self.archived is None:
+                    self.archived = archived_cells(store)
+                new_rows = store.rows_since(self.last_id)
+                if not new_rows.empty:
+                    self._append(type_rows(new_rows))
+                self.version = version
+        return self.df
+
+    def load_window(self, store, date_from, date_to):
+        """Fill a new frame with only the records dated [date_from, date_to] (a fixed window, not synced further)."""
+        with self._lock:
+            self.archived = archived_cells(store, date_from, date_to)
+            rows = store.query(date_from, date_to)
+            if not rows.empty:
+                self._append(type_rows(rows))
+            self.version = store.version()
+        return self
+
+    def _append(self, typed):
+        self.df = self._combine(typed)
+        self.last_id = int(typed["id"].iloc[-1])
+
+    def _combine(self, typed):
+        """Current frame plus typed rows, with coded columns rebuilt over the grown registries."""
+        old = self.df
+        columns = {}
+        for column in FRAME_COLUMNS:
+            if column in CODED_COLUMNS:
+                codes = self.registries[column].encode(typed[column])
+                if old is not None and len(old):
+                    codes = np.concatenate([old[column].cat.codes.to_numpy().astype("int32"), codes])
+                columns[column] = pd.Categorical.from_codes(codes, categories=self.registries[column].categories())
+            else:
+                values = typed[column].to_numpy()
+                if old is not None and len(old):
+                    values = np.concatenate([old[column].to_numpy(), values])
+                columns[column] = values
+        return pd.DataFrame(columns)
+
+    def memory_usage(self):
+        """Bytes held by the frame (including registry strings)."""
+        return int(self.df.memory_usage(deep=True).sum())
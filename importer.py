@@ -0,0 +1,218 @@
+# Bulk import of production logs (CSV / Excel)
+#
+# Line PLC/MES exports can hold thousands of rows per shift. The file is read in
+# fixed-size chunks; each chunk is validated with vectorized checks against the
+# configured areas/models, de-duplicated by its natural key within the file and
+# against the store, and committed as one batch. The key is the full-resolution
+# timestamp (seconds and below, although the store keeps minutes), area, model,
+# supervisor, quantity and the file's own record id when it has one, so distinct
+# rows logged within the same minute are all kept.
+# Rejected rows are streamed to a CSV file so memory stays flat for any file size.
+import csv
+import os
+import tempfile
+
+import pandas as pd
+
+DEFAULT_CHUNKSIZE = 5000
+
+# Accepted header spellings -> store column
+COLUMN_ALIASES = {
+    "date": "Date",
+    "timestamp": "Date",
+    "area": "Area",
+    "supervisor": "Supervisor",
+    "category": "Category",
+    "model": "Model",
+    "actual": "Actual",
+    "quantity": "Actual",
+    "qty": "Actual",
+    "product": "Product",
+    "id": "Source_Id",
+    "seq": "Source_Id",
+    "sequence": "Source_Id",
+    "record_id": "Source_Id",
+    "record id": "Source_Id",
+}
+
+# Short product tags accepted in files
+PRODUCT_ALIASES = {"CRF": "CRF_PARTS"}
+
+REJECT_COLUMNS = ["Row", "Reason", "Date", "Area", "Supervisor", "Category", "Model", "Actual", "Product", "Source_Id"]
+
+
+class AreaRule:
+    """What an area accepts: its models, product tag, default and allowed categories."""
+
+    def __init__(self, models, product, category, categories=None):
+        self.models = set(models)
+        self.product = product
+        self.category = category
+        self.categories = set(categories) if categories is not None else {category}
+
+
+def read_chunks(source, name, chunksize=DEFAULT_CHUNKSIZE):
+    """Yield (DataFrame chunk, fraction of the file consumed) from a CSV or XLSX upload."""
+    if name.lower().endswith((".xlsx", ".xlsm")):
+        yield from _read_xlsx_chunks(source, chunksize)
+        return
+    size = _size_of(source)
+    for chunk in pd.read_csv(source, chunksize=chunksize, dtype=str, keep_default_na=False):
+        done = min(source.tell() / size, 1.0) if size else 0.0
+        yield chunk, done
+
+
+def _read_xlsx_chunks(source, chunksize):
+    from openpyxl import load_workbook
+
+    # read_only streams rows instead of loading the whole sheet
+    wb = load_workbook(source, read_only=True, data_only=True)
+    try:
+        ws = wb.active
+        rows = ws.iter_rows(values_only=True)
+        header = [str(h) if h is not None else "" for h in next(rows, [])]
+        total = max((ws.max_row or 1) - 1, 1)
+        seen = 0
+        buffer = []
+        for row in rows:
+            buffer.append(["" if v is None else str(v) for v in row])
+            if len(buffer) >= chunksize:
+                seen += len(buffer)
+                yield pd.DataFrame(buffer, columns=header), min(seen / total, 1.0)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=header), 1.0
+    finally:
+        wb.close()
+
+
+def _size_of(source):
+    try:
+        pos = source.tell()
+        source.seek(0, os.SEEK_END)
+        size = source.tell()
+        source.seek(pos)
+        return size
+    except (AttributeError, OSError):
+        return 0
+
+
+def normalize_columns(chunk):
+    renamed = {c: COLUMN_ALIASES.get(str(c).strip().lower(), c) for c in chunk.columns}
+    chunk = chunk.rename(columns=renamed)
+    for col in ["Date", "Area", "Supervisor", "Category", "Model", "Actual", "Product", "Source_Id"]:
+        if col not in chunk.columns:
+            chunk[col] = ""
+    return chunk
+
+
+def natural_key(df):
+    """Dedup key of validated rows: full-resolution Timestamp, Area, Model, Supervisor, Actual, Source_Id."""
+    return (df["Timestamp"].dt.strftime("%Y-%m-%d %H:%M:%S.%f") + "|" + df["Area"] + "|" + df["Model"] + "|"
+            + df["Supervisor"] + "|" + df["Actual"].astype(str) + "|" + df["Source_Id"])
+
+
+def validate_chunk(chunk, rules, default_supervisor=""):
+    """Split a normalized chunk into (valid records DataFrame, rejects DataFrame with Reason)."""
+    df = chunk.copy()
+    for col in ["Date", "Area", "Supervisor", "Category", "Model", "Actual", "Product", "Source_Id"]:
+        df[col] = df[col].astype(str).str.strip()
+    df.loc[df["Supervisor"] == "", "Supervisor"] = default_supervisor or ""
+
+    reason = pd.Series("", index=df.index, dtype=object)
+
+    def reject(mask, text):
+        reason[mask & (reason == "")] = text
+
+    parsed = pd.to_datetime(df["Date"], errors="coerce", format="mixed")
+    reject(parsed.isna(), "Invalid date")
+    # the store keeps minutes; the dedup key keeps the full timestamp
+    df["Timestamp"] = parsed
+    df["Date"] = parsed.dt.strftime("%Y-%m-%d %H:%M")
+
+    known_area = df["Area"].isin(list(rules))
+    reject(~known_area, "Unknown area")
+
+    area_models = df["Area"].map({a: r.models for a, r in rules.items()})
+    model_ok = pd.Series(
+        [isinstance(ms, set) and m in ms for m, ms in zip(df["Model"], area_models)], index=df.index
+    )
+    reject(known_area & ~model_ok, "Model not configured for area")
+
+    expected_product = df["Area"].map({a: r.product for a, r in rules.items()})
+    product = df["Product"].str.upper().replace(PRODUCT_ALIASES)
+    product = product.where(product != "", expected_product)
+    reject(known_area & (product != expected_product), "Product tag does not match area")
+    df["Product"] = product
+
+    default_category = df["Area"].map({a: r.category for a, r in rules.items()})
+    df["Category"] = df["Category"].where(df["Category"] != "", default_category)
+    allowed_categories = df["Area"].map({a: r.categories for a, r in rules.items()})
+    category_ok = pd.Series(
+        [isinstance(cs, set) and c in cs for c, cs in zip(df["Category"], allowed_categories)], index=df.index
+    )
+    reject(known_area & ~category_ok, "Unknown category")
+
+    actual = pd.to_numeric(df["Actual"], errors="coerce")
+    reject(actual.isna() | (actual < 1) | (actual % 1 != 0), "Quantity must be a whole number >= 1")
+    reject(df["Supervisor"] == "", "Supervisor missing")
+
+    valid = reason == ""
+    good = df[valid].copy()
+    good["Actual"] = actual[valid].astype("int64")
+    rejects = chunk[~valid].copy()
+    rejects["Reason"] = reason[~valid]
+    return good, rejects
+
+
+def import_production_log(store, source, name, rules, default_supervisor="", chunksize=DEFAULT_CHUNKSIZE, progress=None):
+    """Stream a production log into the store chunk by chunk.
+
+    rules maps area -> AreaRule. progress(fraction, stats) is called after each
+    committed chunk. Returns stats with read / imported / rejected / duplicates
+    counts and reject_path (CSV of rejected rows, or None when there are none).
+    """
+    stats = {"read": 0, "imported": 0, "rejected": 0, "duplicates": 0, "reject_path": None}
+    reject_file = None
+    writer = None
+    row_offset = 0
+    try:
+        for chunk, done in read_chunks(source, name, chunksize):
+            chunk = normalize_columns(chunk)
+            chunk.index = range(row_offset + 2, row_offset + 2 + len(chunk))  # file line numbers incl. header
+            row_offset += len(chunk)
+            stats["read"] += len(chunk)
+
+            good, rejects = validate_chunk(chunk, rules, default_supervisor)
+            if not good.empty:
+                good["Natural_Key"] = natural_key(good)
+                # earlier chunks are already committed, so the store catches cross-chunk repeats
+                in_chunk = good["Natural_Key"].duplicated()
+                stored = good["Natural_Key"].isin(store.existing_keys(good.loc[~in_chunk, "Natural_Key"]))
+                duplicate = in_chunk | stored
+                if duplicate.any():
+                    dupes = chunk.loc[good.index[duplicate]].copy()
+                    dupes["Reason"] = "Duplicate (Timestamp, Area, Model, Supervisor, Quantity, Id)"
+                    rejects = pd.concat([rejects, dupes])
+                    stats["duplicates"] += int(duplicate.sum())
+                good = good[~duplicate]
+                records = good[["Date", "Area", "Supervisor", "Category", "Model", "Actual", "Product", "Natural_Key"]]
+                stats["imported"] += store.append(records.to_dict("records"))
+
+            if not rejects.empty:
+                if writer is None:
+                    reject_file = tempfile.NamedTemporaryFile("w", suffix="_rejects.csv", delete=False, newline="")
+                    writer = csv.writer(reject_file)
+                    writer.writerow(REJECT_COLUMNS)
+                    stats["reject_path"] = reject_file.name
+                out = rejects.sort_index()
+                out.insert(0, "Row", out.index)
+                writer.writerows(out.reindex(columns=REJECT_COLUMNS).fillna("").itertuples(index=False, name=None))
+                stats["rejected"] += len(rejects)
+
+            if progress is not None:
+                progress(done, stats)
+    finally:
+        if reject_file is not None:
+            reject_file.close()
+    return stats
@@ -0,0 +1,192 @@
+# Array-backed production plans
+#
+# Plans are saved as nested dicts (monthly_plans[YYYY-MM][model],
+# daily_plans[YYYY-MM-DD][model], legacy plan_data[model]). PlanMatrix loads one
+# month of them into a model x day array with O(1) model / day indexes, so
+# reports slice whole plan vectors instead of resolving models one at a time.
+# Days without an explicit daily plan take the monthly target phased over the
+# plant's working days (see phase_monthly). plan_grid / grid_changes back the
+# Plan Entry grids: edits are diffed so only changed cells are written.
+import calendar
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from context import DEFAULT_CALENDAR
+
+WEEKDAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+
+def month_days(month_str):
+    year, month = int(month_str[:4]), int(month_str[5:7])
+    return [f"{month_str}-{d:02d}" for d in range(1, calendar.monthrange(year, month)[1] + 1)]
+
+
+def working_days(month_str, plant_calendar=None):
+    """Boolean mask over the month's days: False on weekly off days and holidays."""
+    plant_calendar = plant_calendar or DEFAULT_CALENDAR
+    days = month_days(month_str)
+    weekday = np.array([date.fromisoformat(d).weekday() for d in days])
+    mask = ~np.isin(weekday, list(plant_calendar.get("weekly_off", [])))
+    mask &= ~np.isin(np.array(days), list(plant_calendar.get("holidays", [])))
+    return mask
+
+
+def working_day_count(date_from, date_to, plant_calendar=None):
+    """Number of working days in [date_from, date_to], which may span months."""
+    if date_from > date_to:
+        return 0
+    plant_calendar = plant_calendar or DEFAULT_CALENDAR
+    days = pd.date_range(date_from, date_to, freq="D")
+    mask = ~np.isin(days.weekday, list(plant_calendar.get("weekly_off", [])))
+    mask &= ~np.isin(days.strftime("%Y-%m-%d"), list(plant_calendar.get("holidays", [])))
+    return int(mask.sum())
+
+
+def phase_monthly(monthly, mask):
+    """Spread monthly targets (one per model, NaN = no plan) over the working days in mask.
+
+    Whole units only: every working day gets floor(target / n) and the first
+    (target mod n) working days one more, so each row sums to its target.
+    A month with no working day is phased over all its days.
+    """
+    monthly = np.asarray(monthly, dtype="float64")
+    mask = np.asarray(mask, dtype=bool)
+    if not mask.any():
+        mask = np.ones_like(mask)
+    n = int(mask.sum())
+    target = np.nan_to_num(np.round(monthly))
+    base = np.floor_divide(target, n)
+    extra = target - base * n
+    # rank of each working day (1..n); non-working days never receive units
+    rank = np.where(mask, np.cumsum(mask), 0)
+    phased = np.where(mask, base[:, None] + (rank[None, :] <= extra[:, None]), 0.0)
+    phased[np.isnan(monthly)] = np.nan
+    return phased
+
+
+def monthly_targets(models, monthly_plans_for_month, plan_data):
+    """Monthly target per model (monthly_plans first, legacy plan_data fallback); NaN without one."""
+    targets = np.full(len(models), np.nan)
+    for i, model in enumerate(models):
+        value = monthly_plans_for_month.get(model, None)
+        if value is None:
+            value = plan_data.get(model, {}).get('monthly', None)
+        try:
+            targets[i] = np.nan if value is None else float(value)
+        except Exception:
+            pass
+    return targets
+
+
+class PlanMatrix:
+    """One month of plans for a fixed model list.
+
+    monthly: target per model; explicit: daily plans as entered (NaN where none);
+    daily: explicit daily plans, else the phased monthly target.
+    """
+
+    def __init__(self, ctx, month_str, models):
+        self.month = month_str
+        self.models = list(models)
+        self.model_index = {m: i for i, m in enumerate(self.models)}
+        self.days = month_days(month_str)
+        self.day_index = {d: j for j, d in enumerate(self.days)}
+
+        self.monthly = monthly_targets(self.models, ctx["monthly_plans"].get(month_str, {}), ctx["plan_data"])
+        self.explicit = np.full((len(self.models), len(self.days)), np.nan)
+        daily_plans = ctx["daily_plans"]
+        for j, day in enumerate(self.days):
+            for model, value in daily_plans.get(day, {}).items():
+                i = self.model_index.get(model)
+                if i is None:
+                    continue
+                try:
+                    self.explicit[i, j] = int(value)
+                except Exception:
+                    pass
+        self.working = working_days(month_str, ctx["plant_calendar"])
+        self.phased = phase_monthly(self.monthly, self.working)
+        self.daily = np.where(np.isnan(self.explicit), self.phased, self.explicit)
+
+    def rows(self, models):
+        return np.array([self.model_index[m] for m in models], dtype="int64")
+
+    def monthly_total(self, models):
+        """Sum of monthly targets over models; NaN when none of them has one."""
+        values = self.monthly[self.rows(models)]
+        return np.nan if values.size == 0 or np.all(np.isnan(values)) else float(np.nansum(values))
+
+    def explicit_day(self, date_str):
+        """Entered daily plan of every model for one day (NaN where none was entered)."""
+        return self.explicit[:, self.day_index[date_str]]
+
+    def period_total(self, date_from, date_to, models):
+        """Sum of the daily plan over models and the month's days within [date_from, date_to]; NaN without any plan."""
+        cols = [j for d, j in self.day_index.items() if date_from <= d <= date_to]
+        values = self.daily[np.ix_(self.rows(models), cols)]
+        return np.nan if values.size == 0 or np.all(np.isnan(values)) else float(np.nansum(values))
+
+
+def period_plan_total(ctx, models, date_from, date_to):
+    """Daily plan summed over models and [date_from, date_to], which may span months."""
+    total = np.nan
+    year, month = int(date_from[:4]), int(date_from[5:7])
+    while f"{year:04d}-{month:02d}" <= date_to[:7]:
+        part = PlanMatrix(ctx, f"{year:04d}-{month:02d}", models).period_total(date_from, date_to, models)
+        if not np.isnan(part):
+            total = part if np.isnan(total) else total + part
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return total
+
+
+def plan_grid(plans, models, periods, fallback=None):
+    """Editable models x periods grid of plans[period][model].
+
+    Cells without a stored plan hold fallback(model) when given, else NaN (left empty).
+    """
+    values = np.full((len(models), len(periods)), np.nan)
+    for j, period in enumerate(periods):
+        stored = plans.get(period, {})
+        for i, model in enumerate(models):
+            value = stored.get(model, None)
+            if value is None and fallback is not None:
+                value = fallback(model)
+            try:
+                values[i, j] = np.nan if value is None else float(value)
+            except Exception:
+                pass
+    return pd.DataFrame(values, index=pd.Index(models, name="Model"), columns=list(periods))
+
+
+def grid_changes(before, after):
+    """{period: {model: int or None}} for every cell that differs between two plan grids.
+
+    None means the cell was cleared (its stored plan should be removed).
+    """
+    after = after.reindex(index=before.index, columns=before.columns)
+    old = before.to_numpy(dtype="float64")
+    new = pd.DataFrame(after).apply(pd.to_numeric, errors="coerce").to_numpy(dtype="float64")
+    changed = ~((old == new) | (np.isnan(old) & np.isnan(new)))
+    changes = {}
+    for i, j in zip(*np.nonzero(changed)):
+        value = new[i, j]
+        changes.setdefault(before.columns[j], {})[before.index[i]] = None if np.isnan(value) else int(value)
+    return changes
+
+
+def apply_changes(plans, changes):
+    """Write grid_changes into a plans dict in place; returns the number of cells written."""
+    written = 0
+    for period, cells in changes.items():
+        stored = plans.setdefault(period, {})
+        for model, value in cells.items():
+            if value is None:
+                stored.pop(model, None)
+            else:
+                stored[model] = value
+            written += 1
+        if not stored:
+            del plans[period]
+    return written
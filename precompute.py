@@ -0,0 +1,141 @@
+# Background precompute of the standard report snapshots
+#
+# Opening "3. Plan Vs Actual Report" used to build today's WIP grids, Daily
+# Achievement and the current Monthly Report on the spot. SnapshotWorker keeps
+# those ready in a background thread instead: it rebuilds after notify() (the
+# app calls it once a batch or a setting is committed) and on a timer, which
+# also picks up commits from other processes (CLI, importer) through the
+# store's version counter, and the date rolling over at midnight.
+# Readers are served the latest snapshot at once, with its age, even while a
+# newer one is being built (stale-while-revalidate). The report modules are
+# imported on the worker thread at its first build, not when the app starts.
+import threading
+import time
+from datetime import datetime
+
+from context import DIVISIONS, load_context
+
+# Seconds between timer rebuilds when nothing notifies the worker
+REFRESH_INTERVAL = 300
+
+
+def build_reports(cube, ctx, date_str):
+    """The standard reports for one day, keyed like Snapshot.reports (None where a report has no data)."""
+    from engine import daily_achievement, monthly_report, wip_grid
+    reports = {("wip", division): wip_grid(cube, ctx, date_str, division) for division in DIVISIONS}
+    reports[("daily", "All")] = daily_achievement(cube, ctx, date_str, "All")
+    reports[("monthly", "All")] = monthly_report(cube, ctx, date_str[:7], "All", as_of=date_str)
+    return reports
+
+
+class Snapshot:
+    """Reports built from one store version for one day."""
+
+    def __init__(self, version, date_str, reports, built_at, build_seconds):
+        self.version = version
+        self.date = date_str
+        self.reports = reports
+        self.built_at = built_at
+        self.build_seconds = build_seconds
+
+    @property
+    def age(self):
+        return time.time() - self.built_at
+
+
+def describe_age(seconds):
+    if seconds < 60:
+        return f"{int(seconds)} s"
+    if seconds < 3600:
+        return f"{int(seconds // 60)} min"
+    return f"{seconds / 3600:.1f} h"
+
+
+class SnapshotWorker:
+    """Rebuilds the report snapshot in a daemon thread.
+
+    It also holds the typed production frame and rollup cube the app's sessions
+    share (see rollups()), so snapshots and live reports read the same cells.
+    """
+
+    def __init__(self, store, interval=REFRESH_INTERVAL):
+        self.store = store
+        self.production = None
+        self.cube = None
+        self.interval = interval
+        self.snapshot = None
+        self.error = None
+        self._wake = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self, delay=0.0):
+        """Run the worker; the first build waits up to delay seconds unless notified sooner."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, args=(delay,), name="report-snapshots", daemon=True)
+                self._thread.start()
+        return self
+
+    def rollups(self):
+        """(production frame, rollup cube), created on first use; callers sync them."""
+        with self._lock:
+            if self.production is None:
+                from frame import ProductionFrame
+                from rollup import RollupCube
+                self.production, self.cube = ProductionFrame(), RollupCube()
+        return self.production, self.cube
+
+    def reset(self):
+        """Drop the shared frame and cube (after records moved to or from the archive); rollups() reloads them."""
+        with self._lock:
+            self.production, self.cube = None, None
+        self.notify()
+
+    def notify(self):
+        """Ask for a rebuild (after a commit); returns immediately."""
+        self._wake.set()
+
+    def _run(self, delay):
+        timeout = delay
+        while True:
+            self._wake.wait(timeout)
+            timeout = self.interval
+            self._wake.clear()
+            try:
+                self.rebuild()
+                self.error = None
+            except Exception as exc:
+                # keep serving the last good snapshot; the next wake-up retries
+                self.error = exc
+
+    def is_current(self, snapshot):
+        return (snapshot is not None and snapshot.version == self.store.version()
+                and snapshot.date == datetime.now().strftime("%Y-%m-%d"))
+
+    def rebuild(self, force=False):
+        """Build a new snapshot unless the current one already matches the store and date."""
+        if not force and self.is_current(self.snapshot):
+            return self.snapshot
+        # read the version first: a commit landing mid-build triggers another rebuild
+        version = self.store.version()
+        date_str = datetime.now().strftime("%Y-%m-%d")
+        t0 = time.perf_counter()
+        production, cube = self.rollups()
+        production.sync(self.store)
+        cube.sync(production)
+        reports = build_reports(cube, load_context(self.store), date_str)
+        self.snapshot = Snapshot(version, date_str, reports, time.time(), time.perf_counter() - t0)
+        return self.snapshot
+
+    def get(self, key, date_str):
+        """(report, snapshot) for key on date_str from the latest snapshot, or None when it has none.
+
+        A stale snapshot is still returned; a rebuild is requested in the background.
+        """
+        snapshot = self.snapshot
+        if not self.is_current(snapshot):
+            self.notify()
+        if snapshot is None or snapshot.date != date_str or key not in snapshot.reports:
+            return None
+        return snapshot.reports[key], snapshot
@@ -0,0 +1,154 @@
+# Opt-in rerun profiler
+#
+#   with profiler.section("monthly report") as s:
+#       report_df = monthly_report(...)
+#       s.rows = len(report_df)
+#
+# Disabled sections cost one attribute check. When enabled, every section records
+# wall time, rows processed and its tracemalloc peak against the current rerun;
+# samples are kept in a rolling history that can be summarised or exported as JSON.
+# Recording needs only the standard library; pandas loads when a summary is built.
+#
+# tracemalloc is process-wide while each session has its own Profiler: tracing
+# runs as long as any profiler is enabled, and the peak is only reset when no
+# other session is inside a section, so sessions never lower each other's
+# peaks. A peak therefore counts every allocation in the process during the
+# section, including those of other sessions recording at the same time.
+import json
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+
+HISTORY_SIZE = 2000
+SUMMARY_COLUMNS = ["Section", "Runs", "p50 ms", "p90 ms", "p99 ms", "Max ms", "Rows (last)", "Process Peak KB (max)"]
+
+_tracing_lock = threading.Lock()
+_tracing = {"profilers": 0, "started": False, "open_sections": 0}
+
+
+class Section:
+    """Handle yielded by Profiler.section; set .rows inside the block."""
+
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+        self.seconds = 0.0
+        self.peak_bytes = 0
+        self._base = 0
+        self._peak = 0
+
+
+class Profiler:
+    def __init__(self, history_size=HISTORY_SIZE):
+        self.enabled = False
+        self.history = deque(maxlen=history_size)
+        self.run_id = 0
+        self.run_label = ""
+        self._stack = []
+
+    def enable(self):
+        if not self.enabled:
+            self.enabled = True
+            with _tracing_lock:
+                if _tracing["profilers"] == 0 and not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                    _tracing["started"] = True
+                _tracing["profilers"] += 1
+
+    def disable(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        self._stack = []
+        with _tracing_lock:
+            _tracing["profilers"] -= 1
+            # stop only tracing we started, once the last recording session is done
+            if _tracing["profilers"] == 0 and _tracing["started"]:
+                tracemalloc.stop()
+                _tracing["started"] = False
+
+    def __del__(self):
+        # an ended session still holds a share of the tracing
+        self.disable()
+
+    def start_run(self, label):
+        """Mark the start of a script (or fragment) rerun; later samples belong to it."""
+        self.run_id += 1
+        self.run_label = label
+
+    @contextmanager
+    def section(self, name, rows=None):
+        sec = Section(name, rows)
+        if not self.enabled:
+            yield sec
+            return
+        with _tracing_lock:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                # the enclosing section keeps the peak seen so far before we reset it
+                parent = self._stack[-1]
+                parent._peak = max(parent._peak, peak)
+            if _tracing["open_sections"] == len(self._stack):
+                # only this session's sections are open: resetting lowers no one else's peak
+                tracemalloc.reset_peak()
+            _tracing["open_sections"] += 1
+        sec._base = current
+        self._stack.append(sec)
+        t0 = time.perf_counter()
+        try:
+            yield sec
+        finally:
+            sec.seconds = time.perf_counter() - t0
+            with _tracing_lock:
+                _tracing["open_sections"] -= 1
+            self._stack.pop()
+            if tracemalloc.is_tracing():
+                peak = max(sec._peak, tracemalloc.get_traced_memory()[1])
+                sec.peak_bytes = max(0, peak - sec._base)
+                if self._stack:
+                    self._stack[-1]._peak = max(self._stack[-1]._peak, peak)
+            self.history.append({
+                "run": self.run_id,
+                "run_label": self.run_label,
+                "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "section": name,
+                "depth": len(self._stack),
+                "seconds": sec.seconds,
+                "rows": sec.rows,
+                "peak_kb": round(sec.peak_bytes / 1024, 1),
+            })
+
+    def clear(self):
+        self.history.clear()
+
+    def summary(self):
+        """Percentiles per section over the rolling history."""
+        import numpy as np
+        import pandas as pd
+        if not self.history:
+            return pd.DataFrame(columns=SUMMARY_COLUMNS)
+        samples = pd.DataFrame(list(self.history))
+        rows = []
+        for name, group in samples.groupby("section", sort=False):
+            ms = group["seconds"].to_numpy() * 1000
+            p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+            rows.append([name, len(group), p50, p90, p99, ms.max(), group["rows"].iloc[-1], group["peak_kb"].max()])
+        return pd.DataFrame(rows, columns=SUMMARY_COLUMNS)
+
+    def recent_runs(self, limit=20):
+        """Total time per rerun, newest first."""
+        import pandas as pd
+        if not self.history:
+            return pd.DataFrame(columns=["Run", "Label", "Sections", "Total ms"])
+        samples = pd.DataFrame(list(self.history))
+        # nested sections are already inside their parent's time
+        samples = samples[samples["depth"] == 0]
+        runs = samples.groupby(["run", "run_label"], sort=False).agg(Sections=("section", "count"), Total=("seconds", "sum"))
+        runs = runs.reset_index().rename(columns={"run": "Run", "run_label": "Label"})
+        runs["Total ms"] = runs.pop("Total") * 1000
+        return runs.sort_values("Run", ascending=False).head(limit)
+
+    def export_json(self, meta=None):
+        return json.dumps({"meta": meta or {}, "samples": list(self.history)}, indent=2)
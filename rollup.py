@@ -0,0 +1,269 @@
+# Pre-aggregated day x area x model rollup
+#
+# Every report sums `Actual` by day, area and model. The cube keeps those sums
+# (sparse: only cells that were produced) so reports read O(models x areas)
+# cells for a day instead of masking raw rows. It is advanced from the typed
+# production frame right after each submit and can be rebuilt from, or checked
+# against, the raw history. Closed months compacted out of the store (see
+# archive.py) are seeded from their archived cells, which the frame carries.
+# A prefix-sum index over the same cells answers date-range and month-to-date
+# totals without walking the days in between.
+import threading
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+CELL_COLUMNS = ["Area", "Model", "Actual", "Category", "First_Id"]
+
+
+def aggregate_rows(df):
+    """Aggregate raw/typed rows to (Report_Date, Area, Model) cells.
+
+    First_Id / Category record the earliest submitted row of each cell so report
+    code that takes "the first row's Category" keeps the same answer.
+    """
+    if df.empty:
+        return pd.DataFrame(columns=["Report_Date"] + CELL_COLUMNS)
+    ordered = df.sort_values("id", kind="stable")
+    grouped = ordered.groupby(["Report_Date", "Area", "Model"], sort=True, observed=True)
+    out = grouped.agg(Actual=("Actual", "sum"), Category=("Category", "first"), First_Id=("id", "first"))
+    out = out.reset_index()
+    # the typed frame stores these as categoricals; cells carry plain values
+    coded = [c for c in ["Report_Date", "Area", "Model", "Category"] if isinstance(out[c].dtype, pd.CategoricalDtype)]
+    return out.astype({c: object for c in coded}).astype({"Actual": "int64"})
+
+
+def merge_cells(*frames):
+    """Sum cell frames (Report_Date + CELL_COLUMNS) that may share (day, area, model) keys.
+
+    Category / First_Id stay those of each cell's earliest submitted row.
+    """
+    frames = [f for f in frames if f is not None and not f.empty]
+    if not frames:
+        return pd.DataFrame(columns=["Report_Date"] + CELL_COLUMNS)
+    ordered = pd.concat(frames, ignore_index=True).sort_values("First_Id", kind="stable")
+    grouped = ordered.groupby(["Report_Date", "Area", "Model"], sort=True)
+    out = grouped.agg(Actual=("Actual", "sum"), Category=("Category", "first"), First_Id=("First_Id", "first"))
+    return out.reset_index().astype({"Actual": "int64", "First_Id": "int64"})
+
+
+class PrefixIndex:
+    """Running Actual totals per (area, model) over consecutive calendar days.
+
+    Row i of the matrix holds each cell's total over the days before
+    start + i, so a date-range total is two lookups whatever the range length.
+    New cells only rewrite the rows from their earliest day onwards.
+
+    add() builds the next (start, columns, area columns, matrix) aside and
+    publishes it in one attribute swap; readers take the state once, so they
+    never see a matrix narrower than its column map while a sync runs.
+    """
+
+    def __init__(self):
+        # (first day ordinal or None, (area, model) -> column, area -> [columns], totals matrix)
+        self._state = (None, {}, {}, np.zeros((1, 0), dtype="int64"))
+
+    @property
+    def start(self):
+        return self._state[0]
+
+    @property
+    def n_days(self):
+        return self._state[3].shape[0] - 1
+
+    def add(self, cells):
+        """Fold aggregated cells (Report_Date, Area, Model, Actual) into the running totals."""
+        if cells.empty:
+            return
+        start, columns, area_columns, cum = self._state
+        ordinals = {day: date.fromisoformat(day).toordinal() for day in cells["Report_Date"].unique()}
+        day_ord = cells["Report_Date"].map(ordinals).to_numpy()
+        first, last = int(day_ord.min()), int(day_ord.max())
+
+        if start is None:
+            start = first
+        if first < start:
+            # earlier days: prepend rows, which start from a zero total
+            cum = np.vstack([np.zeros((start - first, cum.shape[1]), dtype="int64"), cum])
+            start = first
+        n_days = cum.shape[0] - 1
+        if last - start + 1 > n_days:
+            cum = np.vstack([cum, np.repeat(cum[-1:], last - start + 1 - n_days, axis=0)])
+            n_days = cum.shape[0] - 1
+
+        columns = dict(columns)
+        area_columns = {area: list(cols) for area, cols in area_columns.items()}
+        cols = []
+        for area, model in zip(cells["Area"], cells["Model"]):
+            col = columns.get((area, model))
+            if col is None:
+                col = columns[(area, model)] = len(columns)
+                area_columns.setdefault(area, []).append(col)
+            cols.append(col)
+        if len(columns) > cum.shape[1]:
+            cum = np.hstack([cum, np.zeros((cum.shape[0], len(columns) - cum.shape[1]), dtype="int64")])
+        elif cum is self._state[3]:
+            cum = cum.copy()
+
+        rows = day_ord - start
+        r0 = int(rows.min())
+        delta = np.zeros((n_days - r0, cum.shape[1]), dtype="int64")
+        np.add.at(delta, (rows - r0, np.asarray(cols)), cells["Actual"].to_numpy(dtype="int64"))
+        cum[r0 + 1:] += np.cumsum(delta, axis=0)
+        self._state = (start, columns, area_columns, cum)
+
+    @staticmethod
+    def _row(state, date_str):
+        """Matrix row holding totals of the days before date_str (clamped to the indexed span)."""
+        start, _columns, _area_columns, cum = state
+        return min(max(date.fromisoformat(date_str).toordinal() - start, 0), cum.shape[0] - 1)
+
+    def area_total(self, date_from, date_to, area):
+        """Actual of every model in area over [date_from, date_to]."""
+        state = self._state
+        start, _columns, area_columns, cum = state
+        cols = area_columns.get(area)
+        if start is None or not cols or date_from > date_to:
+            return 0
+        end = self._row(state, (date.fromisoformat(date_to) + timedelta(days=1)).isoformat())
+        return int(cum[end, cols].sum() - cum[self._row(state, date_from), cols].sum())
+
+    def model_totals(self, date_from, date_to, area, models):
+        """Actual of each of models in area over [date_from, date_to] (0 where never produced)."""
+        state = self._state
+        start, columns, _area_columns, cum = state
+        totals = np.zeros(len(models), dtype="int64")
+        if start is None or date_from > date_to:
+            return totals
+        cols = np.array([columns.get((area, m), -1) for m in models], dtype="int64")
+        known = cols >= 0
+        end = self._row(state, (date.fromisoformat(date_to) + timedelta(days=1)).isoformat())
+        totals[known] = cum[end, cols[known]] - cum[self._row(state, date_from), cols[known]]
+        return totals
+
+    def area_series(self, date_from, date_to, area):
+        """Cumulative Actual of area from date_from through each day up to date_to."""
+        state = self._state
+        start, _columns, area_columns, cum = state
+        days = pd.date_range(date_from, date_to, freq="D")
+        cols = area_columns.get(area)
+        if start is None or not cols:
+            return pd.Series(0, index=days, dtype="int64")
+        ends = np.clip(np.asarray([d.toordinal() for d in days.date]) - start + 1, 0, cum.shape[0] - 1)
+        totals = cum[:, cols].sum(axis=1)
+        return pd.Series(totals[ends] - totals[self._row(state, date_from)], index=days)
+
+
+class RollupCube:
+    """Sparse Actual totals keyed by day -> (area, model).
+
+    Sessions and the snapshot worker share one cube: sync() changes the cells
+    under the lock and the readers below copy them out under the same lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.last_id = 0
+        # cells of archived months, seeded on the first sync
+        self.archived = None
+        # day -> {(area, model): [actual, first_id, first_category]}
+        self._days = {}
+        self.prefix = PrefixIndex()
+
+    def sync(self, production):
+        """Fold in the frame's archived cells (first sync) and the typed-frame rows added since the last sync."""
+        if self.archived is None and production.archived is not None:
+            with self._lock:
+                if self.archived is None:
+                    self.archived = production.archived
+                    if not self.archived.empty:
+                        self._apply(self.archived)
+                        self.prefix.add(self.archived)
+        df = production.df
+        if df.empty or int(df["id"].iloc[-1]) <= self.last_id:
+            return self
+        with self._lock:
+            start = int(np.searchsorted(df["id"].to_numpy(), self.last_id, side="right"))
+            new_rows = df.iloc[start:]
+            if not new_rows.empty:
+                cells = aggregate_rows(new_rows)
+                self._apply(cells)
+                self.prefix.add(cells)
+                self.last_id = int(new_rows["id"].iloc[-1])
+        return self
+
+    def _apply(self, cells):
+        for day, area, model, actual, category, first_id in cells[["Report_Date"] + CELL_COLUMNS].itertuples(index=False):
+            bucket = self._days.setdefault(day, {})
+            cell = bucket.get((area, model))
+            if cell is None:
+                bucket[(area, model)] = [int(actual), int(first_id), category]
+            else:
+                cell[0] += int(actual)
+                if first_id < cell[1]:
+                    cell[1] = int(first_id)
+                    cell[2] = category
+
+    def rebuild(self, production):
+        """Drop every cell and re-aggregate the whole raw history."""
+        with self._lock:
+            self._days = {}
+            self.prefix = PrefixIndex()
+            self.last_id = 0
+            self.archived = None
+        return self.sync(production)
+
+    def verify(self, production):
+        """Compare the cube with a fresh aggregation of the raw history (plus the archived cells).
+
+        Returns a DataFrame of mismatching cells (empty when the cube is consistent).
+        """
+        expected = merge_cells(self.archived, aggregate_rows(production.df[production.df["id"] <= self.last_id]))
+        actual = self.cells(None, None)
+        merged = expected.merge(actual, on=["Report_Date", "Area", "Model"], how="outer", suffixes=("_raw", "_cube"))
+        bad = (merged["Actual_raw"].fillna(-1) != merged["Actual_cube"].fillna(-1)) | (
+            merged["First_Id_raw"].fillna(-1) != merged["First_Id_cube"].fillna(-1)
+        )
+        return merged[bad].reset_index(drop=True)
+
+    def _days_between(self, date_from, date_to):
+        return sorted(d for d in self._days if (date_from is None or d >= date_from) and (date_to is None or d <= date_to))
+
+    def days(self, date_from=None, date_to=None):
+        with self._lock:
+            return self._days_between(date_from, date_to)
+
+    def cells(self, date_from, date_to, areas=None):
+        """Per-day cells in [date_from, date_to] as a long DataFrame (Report_Date + CELL_COLUMNS)."""
+        rows = []
+        with self._lock:
+            for day in self._days_between(date_from, date_to):
+                for (area, model), (actual, first_id, category) in self._days[day].items():
+                    if areas is None or area in areas:
+                        rows.append((day, area, model, actual, category, first_id))
+        return pd.DataFrame(rows, columns=["Report_Date"] + CELL_COLUMNS)
+
+    def day(self, date_str, areas=None):
+        """(area, model) totals for one day, ordered by Model then Area like groupby(['Model', 'Area'])."""
+        cells = self.cells(date_str, date_str, areas=areas)
+        return cells.sort_values(["Model", "Area"]).reset_index(drop=True)[CELL_COLUMNS]
+
+    def period(self, date_from, date_to, areas=None):
+        """(area, model) totals over a date range, in order of each cell's first submission."""
+        cells = self.cells(date_from, date_to, areas=areas)
+        if cells.empty:
+            return cells[CELL_COLUMNS]
+        cells = cells.sort_values("First_Id", kind="stable")
+        out = cells.groupby(["Area", "Model"], sort=False).agg(
+            Actual=("Actual", "sum"), Category=("Category", "first"), First_Id=("First_Id", "first")
+        )
+        return out.reset_index()[CELL_COLUMNS]
+
+    def month(self, month_str, areas=None):
+        return self.period(f"{month_str}-01", f"{month_str}-31", areas=areas)
+
+    def area_total(self, date_str, area):
+        with self._lock:
+            bucket = self._days.get(date_str, {})
+            return sum(cell[0] for (a, _m), cell in bucket.items() if a == area)
@@ -0,0 +1,197 @@
+# Capacity-aware daily scheduling of the CF assembly chain
+#
+# Turns each CF model's monthly target into a daily plan for every chain stage
+# (Pre-Assembly → Cabinet Foaming → Door Foaming → CF Final Line):
+#   - a stage only works units the previous stage finished on an earlier day
+#   - each stage shares its daily capacity (units/day, "line_capacity") across models
+#   - at most "wip_buffer" units wait in front of a stage (0 = unlimited)
+#   - work is levelled over the remaining working days of the plant calendar
+# A day is solved downstream-first, vectorized over models. Re-solving after
+# actuals come in keeps the previous plan of models that are on track and only
+# re-plans the remaining days of the models that drifted.
+from datetime import date, timedelta
+
+import numpy as np
+
+from plans import PlanMatrix
+
+CHAIN_AREAS = ["Pre-Assembly", "Cabinet Foaming", "Door Foaming", "CF Final Line"]
+UNLIMITED = 10 ** 12
+
+
+def allocate(desired, limit):
+    """Whole units per model, at most desired each and limit in total, shared pro rata."""
+    desired = np.maximum(np.asarray(desired, dtype="int64"), 0)
+    total = int(desired.sum())
+    if total <= limit:
+        return desired
+    if limit <= 0:
+        return np.zeros_like(desired)
+    share = desired * (limit / total)
+    out = np.floor(share).astype("int64")
+    # hand the leftover units to the largest remainders
+    leftover = int(limit - out.sum())
+    if leftover > 0:
+        out[np.argsort(-(share - out), kind="stable")[:leftover]] += 1
+    return out
+
+
+def _solve(need, wip, capacity, buffer_room, working, start):
+    """Plan stages x models x days for days >= start.
+
+    need: units each stage still has to complete per model (stages x models);
+    wip: units waiting in front of each stage (row 0 unused);
+    capacity: units per stage and day (stages x days);
+    buffer_room: units allowed to wait in front of each stage per day.
+    """
+    n_stages, n_models = need.shape
+    plan = np.zeros((n_stages, n_models, len(working)), dtype="int64")
+    need = need.copy()
+    wip = wip.copy()
+    days = [d for d in range(start, len(working)) if working[d]]
+    for k, d in enumerate(days):
+        days_left = len(days) - k
+        for s in reversed(range(n_stages)):
+            # upstream stages finish ahead so their last units can still flow downstream
+            effective = max(1, days_left - (n_stages - 1 - s))
+            desired = -(-need[s] // effective)
+            if s > 0:
+                desired = np.minimum(desired, wip[s])
+            limit = int(capacity[s, d])
+            if s < n_stages - 1:
+                limit = min(limit, max(0, int(buffer_room[s + 1, d] - wip[s + 1].sum())))
+            qty = allocate(desired, limit)
+            plan[s, :, d] = qty
+            need[s] -= qty
+            if s > 0:
+                wip[s] -= qty
+            if s < n_stages - 1:
+                wip[s + 1] += qty
+    return plan
+
+
+class ChainSchedule:
+    """Daily plan of every chain stage for one month (plan is stages x models x days)."""
+
+    def __init__(self, month, models, days, working, targets, capacity, buffer, plan, start, done, resolved):
+        self.month = month
+        self.models = models
+        self.days = days
+        self.working = working
+        self.targets = targets
+        self.capacity = capacity
+        self.buffer = buffer
+        self.plan = plan
+        self.start = start
+        self.done = done
+        self.resolved = resolved
+
+    def compatible(self, month, models, working, capacity, buffer, start):
+        return (self.month == month and self.models == models and np.array_equal(self.working, working)
+                and np.array_equal(self.capacity, capacity) and self.buffer == buffer and self.start <= start)
+
+    def expected_done(self, start):
+        """Output per stage and model this schedule expects before day index start."""
+        return self.done + self.plan[:, :, self.start:start].sum(axis=2)
+
+    def shortfall(self, done):
+        """Units per model the final line will miss against target after this plan."""
+        final = done[-1] + self.plan[-1, :, self.start:].sum(axis=1)
+        return np.maximum(self.targets - final, 0)
+
+    def final_line_changes(self, daily_plans):
+        """{day: {model: qty}} of re-planned CF Final Line cells that differ from daily_plans.
+
+        Only models with a monthly target are scheduled; the daily plans of the
+        others (none, or entered by hand) are left as they are.
+        """
+        changes = {}
+        scheduled = [(i, model) for i, model in enumerate(self.models) if self.targets[i] > 0]
+        for d in range(self.start, len(self.days)):
+            if not self.working[d]:
+                continue
+            stored = daily_plans.get(self.days[d], {})
+            for i, model in scheduled:
+                qty = int(self.plan[-1, i, d])
+                if stored.get(model) != qty:
+                    changes.setdefault(self.days[d], {})[model] = qty
+        return changes
+
+
+def chain_models(ctx):
+    return [m for m in ctx["cf_models"] if ctx["active_models"].get(m, True)]
+
+
+def schedule_chain(ctx, month_str, done=None, wip=None, through=None, previous=None):
+    """Schedule the month's CF targets across the chain.
+
+    done: units each stage completed this month (stages x models) through the
+    date `through` (YYYY-MM-DD, None before the month starts); days up to it
+    are kept as they are. wip: units waiting in front of each stage (default:
+    the gaps in done). With a compatible previous schedule only models whose
+    output or target moved are re-planned, inside the capacity the others leave.
+    """
+    models = chain_models(ctx)
+    plans = PlanMatrix(ctx, month_str, models)
+    targets = np.nan_to_num(plans.monthly).astype("int64")
+    days, working = plans.days, plans.working
+    line_capacity = ctx["line_capacity"]
+    capacity_per_stage = np.array([int(line_capacity.get(a) or 0) or UNLIMITED for a in CHAIN_AREAS], dtype="int64")
+    capacity = np.repeat(capacity_per_stage[:, None], len(days), axis=1)
+    buffer = int(ctx["wip_buffer"] or 0) or UNLIMITED
+    buffer_room = np.full((len(CHAIN_AREAS), len(days)), buffer, dtype="int64")
+
+    n_stages = len(CHAIN_AREAS)
+    if done is None:
+        done = np.zeros((n_stages, len(models)), dtype="int64")
+    start = 0 if through is None else sum(1 for d in days if d <= through)
+    need = np.maximum(targets[None, :] - done, 0)
+    if wip is None:
+        wip = np.zeros_like(done)
+        wip[1:] = np.maximum(done[:-1] - done[1:], 0)
+
+    if previous is not None and previous.compatible(month_str, models, working, capacity_per_stage, buffer, start):
+        changed = (previous.expected_done(start) != done).any(axis=0) | (previous.targets != targets)
+        plan = previous.plan.copy()
+        kept = plan[:, ~changed, start:].sum(axis=1)
+        # the models that stay on plan keep their capacity and buffer space
+        capacity[:, start:] -= kept
+        kept_wip = wip[1:, ~changed].sum(axis=1)
+        kept_wip_end = kept_wip[:, None] + np.cumsum(kept[:-1] - kept[1:], axis=1)
+        buffer_room[1:, start:] -= np.concatenate([kept_wip[:, None], kept_wip_end[:, :-1]], axis=1)
+        sub = _solve(need[:, changed], wip[:, changed], capacity, buffer_room, working, start)
+        plan[:, changed, start:] = sub[:, :, start:]
+        resolved = int(changed.sum())
+    else:
+        plan = _solve(need, wip, capacity, buffer_room, working, start)
+        resolved = len(models)
+    return ChainSchedule(month_str, models, days, working, targets, capacity_per_stage, buffer, plan, start, done, resolved)
+
+
+def chain_state(cube, models, month_str, through):
+    """(done, wip) per stage and model: output since the month start through `through`,
+    and units waiting in front of each stage over the whole history (carried-in WIP included)."""
+    last = through or (date.fromisoformat(f"{month_str}-01") - timedelta(days=1)).isoformat()
+    ever = np.stack([cube.prefix.model_totals("0001-01-01", last, area, models) for area in CHAIN_AREAS])
+    wip = np.zeros_like(ever)
+    wip[1:] = np.maximum(ever[:-1] - ever[1:], 0)
+    if through is None:
+        return np.zeros_like(ever), wip
+    done = np.stack([cube.prefix.model_totals(f"{month_str}-01", through, area, models) for area in CHAIN_AREAS])
+    return done, wip
+
+
+def schedule_summary(schedule, done):
+    """Per-stage totals of the new plan, as rows for display."""
+    rows = []
+    for s, area in enumerate(CHAIN_AREAS):
+        planned = schedule.plan[s, :, schedule.start:].sum()
+        rows.append({
+            "Stage": area,
+            "Done": int(done[s].sum()),
+            "Planned (remaining)": int(planned),
+            "Capacity/day": None if schedule.capacity[s] >= UNLIMITED else int(schedule.capacity[s]),
+            "Busiest day": int(schedule.plan[s].sum(axis=0)[schedule.start:].max(initial=0)),
+        })
+    return rows
+
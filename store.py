@@ -0,0 +1,334 @@
+# Durable production store (SQLite, append-only)
+#
+# Every "SUBMIT ALL ENTRIES" batch is appended here instead of being kept in
+# st.session_state, so history survives the session and is shared between
+# supervisors. Rows are never updated; reports read back only the (date, area,
+# model) slice they need through the covering index. The only deletes move a
+# closed month's records into the archive (see archive.py): the parts holding
+# them and their natural keys are registered here in the same commit.
+#
+# The database runs in WAL mode so readers never wait for a writer. All writes
+# go through one writer thread fed by a queue: batches that arrive together
+# (every supervisor submitting at shift end) are committed in a single
+# transaction, each batch inside its own savepoint so it lands all-or-nothing.
+# pandas is imported only by the readers that return DataFrames, so appending
+# and settings work without it (fast cold start of the entry forms).
+import json
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+
+# Logical columns as the report code has always seen them
+RECORD_COLUMNS = ["Date", "Area", "Supervisor", "Category", "Model", "Actual", "Product"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS production (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts TEXT NOT NULL,
+    report_date TEXT NOT NULL,
+    area TEXT NOT NULL,
+    supervisor TEXT,
+    category TEXT,
+    model TEXT NOT NULL,
+    actual INTEGER NOT NULL,
+    product TEXT,
+    natural_key TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_production_date_area_model
+    ON production (report_date, area, model);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0);
+CREATE TABLE IF NOT EXISTS config (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS archive_parts (
+    month TEXT NOT NULL,
+    part TEXT NOT NULL,
+    records INTEGER NOT NULL,
+    PRIMARY KEY (month, part)
+);
+CREATE TABLE IF NOT EXISTS archived_keys (
+    natural_key TEXT PRIMARY KEY
+);
+"""
+
+# only a repeated natural key is skipped; any other constraint failure fails the batch
+_INSERT = (
+    "INSERT INTO production "
+    "(ts, report_date, area, supervisor, category, model, actual, product, natural_key) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (natural_key) DO NOTHING"
+)
+
+_UPSERT_CONFIG = "INSERT INTO config (key, value) VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value"
+
+# Most queued batches folded into one commit
+MAX_BATCHES_PER_COMMIT = 64
+
+_SELECT = (
+    "SELECT id, ts AS Date, report_date AS Report_Date, area AS Area, supervisor AS Supervisor, "
+    "category AS Category, model AS Model, actual AS Actual, product AS Product FROM production"
+)
+_SELECT_ARCHIVE = _SELECT.replace(" FROM production", ", natural_key AS Natural_Key FROM production")
+
+_RESTORE = (
+    "INSERT INTO production "
+    "(id, ts, report_date, area, supervisor, category, model, actual, product, natural_key) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+class ProductionStore:
+    """Append-only production log backed by a single SQLite file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._queue = queue.Queue()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(production)")]
+            if "natural_key" not in columns:
+                conn.execute("ALTER TABLE production ADD COLUMN natural_key TEXT")
+            # imported log rows carry a natural key; manual entries leave it NULL
+            conn.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS idx_production_natural_key ON production (natural_key)"
+            )
+
+    def _connect(self):
+        # one connection per thread: Streamlit serves each session on its own thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            self._local.conn = conn
+        return conn
+
+    def submit(self, records):
+        """Queue a batch of production records (dicts with RECORD_COLUMNS) for commit.
+
+        Returns a Future resolving to the number of rows inserted once the batch
+        is durable. Records may carry a "Natural_Key"; a record whose key is
+        already stored is skipped.
+        """
+        rows = [
+            (
+                r["Date"],
+                r["Date"][:10],
+                r["Area"],
+                r.get("Supervisor"),
+                r.get("Category"),
+                r["Model"],
+                int(r["Actual"]),
+                r.get("Product"),
+                r.get("Natural_Key"),
+            )
+            for r in records
+        ]
+        if not rows:
+            future = Future()
+            future.set_result(0)
+            return future
+        return self._write([(_INSERT, rows)])
+
+    def append(self, records):
+        """Commit a batch atomically and wait for it; returns the number of rows inserted."""
+        return self.submit(records).result()
+
+    def save_config(self, values):
+        """Persist settings (model registries, plans, ...) as JSON under their keys and wait for the commit."""
+        rows = [(key, json.dumps(value)) for key, value in values.items()]
+        return self._write([(_UPSERT_CONFIG, rows)]).result()
+
+    def update_config(self, updates):
+        """Read-modify-write settings in one commit and wait for it; returns the new values.
+
+        updates maps key -> fn(saved value, or None when never saved) -> new value.
+        The saved value is read inside the write transaction, so changes other
+        sessions or processes committed to the same key in the meantime are kept.
+        """
+        saved = {}
+
+        def apply(conn):
+            for key, fn in updates.items():
+                row = conn.execute("SELECT value FROM config WHERE key = ?", (key,)).fetchone()
+                saved[key] = fn(None if row is None else json.loads(row[0]))
+                conn.execute(_UPSERT_CONFIG, (key, json.dumps(saved[key])))
+
+        self._write([(apply, None)]).result()
+        return saved
+
+    def load_config(self, keys=None):
+        """Saved settings by key; with keys, only those that were saved."""
+        sql = "SELECT key, value FROM config"
+        params = []
+        if keys is not None:
+            params = list(keys)
+            sql += f" WHERE key IN ({','.join('?' * len(params))})"
+        return {key: json.loads(value) for key, value in self._connect().execute(sql, params)}
+
+    def _write(self, statements):
+        """Queue [(sql, rows)] to run all-or-nothing on the writer thread; the Future gets the rows changed.
+
+        sql may instead be a function of the writer's connection (rows None), run inside the transaction.
+        """
+        future = Future()
+        self._ensure_writer()
+        self._queue.put((statements, future))
+        return future
+
+    def _ensure_writer(self):
+        with self._writer_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._write_loop, name="production-store-writer", daemon=True)
+                self._writer.start()
+
+    def _write_loop(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        while True:
+            pending = [self._queue.get()]
+            # group commit: take whatever else queued up while the last commit ran
+            while len(pending) < MAX_BATCHES_PER_COMMIT:
+                try:
+                    pending.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._commit(conn, pending)
+
+    def _commit(self, conn, pending):
+        results = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for statements, future in pending:
+                conn.execute("SAVEPOINT batch")
+                before = conn.total_changes
+                try:
+                    for sql, rows in statements:
+                        if callable(sql):
+                            sql(conn)
+                        else:
+                            conn.executemany(sql, rows)
+                except Exception as exc:
+                    conn.execute("ROLLBACK TO batch")
+                    conn.execute("RELEASE batch")
+                    results.append((future, None, exc))
+                    continue
+                conn.execute("RELEASE batch")
+                results.append((future, conn.total_changes - before, None))
+            # readers compare this counter to know whether anything changed
+            conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+            conn.execute("COMMIT")
+        except Exception as exc:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for _statements, future in pending:
+                future.set_exception(exc)
+            return
+        for future, inserted, exc in results:
+            if exc is None:
+                future.set_result(inserted)
+            else:
+                future.set_exception(exc)
+
+    def existing_keys(self, keys):
+        """Subset of the given natural keys that are already stored (live or archived)."""
+        keys = list(keys)
+        found = set()
+        conn = self._connect()
+        # stay under SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            part = keys[start:start + 500]
+            marks = ','.join('?' * len(part))
+            sql = (f"SELECT natural_key FROM production WHERE natural_key IN ({marks}) "
+                   f"UNION SELECT natural_key FROM archived_keys WHERE natural_key IN ({marks})")
+            found.update(row[0] for row in conn.execute(sql, part + part))
+        return found
+
+    def version(self):
+        """Write version counter, bumped on every commit."""
+        return self._connect().execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+    def last_id(self):
+        """Highest committed record id (0 when empty)."""
+        return self._connect().execute("SELECT COALESCE(MAX(id), 0) FROM production").fetchone()[0]
+
+    def rows_since(self, last_id):
+        """Records with id > last_id, in submission order (incremental readers)."""
+        import pandas as pd
+        return pd.read_sql_query(_SELECT + " WHERE id > ? ORDER BY id", self._connect(), params=[last_id])
+
+    def query(self, date_from=None, date_to=None, areas=None, models=None):
+        """Return the records in [date_from, date_to] (YYYY-MM-DD, inclusive) as a DataFrame.
+
+        Filters map onto the (report_date, area, model) index; rows come back in
+        submission order with their store id and Report_Date key.
+        """
+        clauses = []
+        params = []
+        if date_from is not None:
+            clauses.append("report_date >= ?")
+            params.append(date_from)
+        if date_to is not None:
+            clauses.append("report_date <= ?")
+            params.append(date_to)
+        if areas is not None:
+            areas = list(areas)
+            clauses.append(f"area IN ({','.join('?' * len(areas))})")
+            params.extend(areas)
+        if models is not None:
+            models = list(models)
+            clauses.append(f"model IN ({','.join('?' * len(models))})")
+            params.extend(models)
+        sql = _SELECT
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY id"
+        import pandas as pd
+        return pd.read_sql_query(sql, self._connect(), params=params)
+
+    def months(self):
+        """Months (YYYY-MM) that have live records, oldest first."""
+        sql = "SELECT DISTINCT substr(report_date, 1, 7) FROM production ORDER BY 1"
+        return [row[0] for row in self._connect().execute(sql)]
+
+    def month_records(self, month_str):
+        """A month's live records with their natural keys, in submission order (for archiving)."""
+        import pandas as pd
+        sql = _SELECT_ARCHIVE + " WHERE report_date >= ? AND report_date <= ? ORDER BY id"
+        return pd.read_sql_query(sql, self._connect(), params=[f"{month_str}-01", f"{month_str}-31"])
+
+    def archive_parts(self):
+        """Registered archive parts as (month, part, records), oldest first."""
+        sql = "SELECT month, part, records FROM archive_parts ORDER BY month, part"
+        return self._connect().execute(sql).fetchall()
+
+    def archive_month(self, month_str, part, last_id, records, keys):
+        """In one commit: register an archive part of month_str holding `records` records, keep
+        their natural keys and delete the month's live records up to last_id. Waits for the commit."""
+        return self._write([
+            ("INSERT INTO archive_parts (month, part, records) VALUES (?, ?, ?)", [(month_str, part, records)]),
+            ("INSERT OR IGNORE INTO archived_keys (natural_key) VALUES (?)", [(key,) for key in keys]),
+            ("DELETE FROM production WHERE report_date >= ? AND report_date <= ? AND id <= ?",
+             [(f"{month_str}-01", f"{month_str}-31", last_id)]),
+        ]).result()
+
+    def restore_month(self, month_str, records):
+        """In one commit: put archived records (dicts with id and Natural_Key) back in the live
+        table under their original ids and unregister the month's archive parts. Waits for the commit."""
+        rows = [
+            (int(r["id"]), r["Date"], r["Report_Date"], r["Area"], r.get("Supervisor"), r.get("Category"),
+             r["Model"], int(r["Actual"]), r.get("Product"), r.get("Natural_Key"))
+            for r in records
+        ]
+        return self._write([
+            (_RESTORE, rows),
+            ("DELETE FROM archived_keys WHERE natural_key = ?", [(row[-1],) for row in rows if row[-1] is not None]),
+            ("DELETE FROM archive_parts WHERE month = ?", [(month_str,)]),
+        ]).result()
@@ -0,0 +1,99 @@
+# Conditional formatting for the report tables
+#
+# Each function takes the whole (visible) table and returns a same-shaped
+# DataFrame of CSS strings, computed column-at-a-time with NumPy. Use with
+# `df.style.apply(func, axis=None)` instead of a per-row Python callback.
+import numpy as np
+import pandas as pd
+
+BOLD = "font-weight: bold;"
+NEUTRAL = "background-color: #f8f9fa; color: #333333;"
+GREY = "background-color: #f0f0f0; color: #6c757d;"
+BLUE = "background-color: #e7f3ff; color: #0b5394; font-weight: 600;"
+GREEN = "background-color: #d4edda; color: #155724; font-weight: 600;"
+GREEN_STRONG = "background-color: #d4edda; color: #155724; font-weight: 700;"
+GREEN_LIGHT = "background-color: #e2f0d9; color: #155724;"
+YELLOW = "background-color: #fff3cd; color: #856404;"
+RED = "background-color: #f8d7da; color: #721c24;"
+
+# Achievement % thresholds, highest first
+ACH_THRESHOLDS = [(100, GREEN_STRONG), (90, GREEN_LIGHT), (75, YELLOW)]
+
+
+def _numeric(col):
+    return pd.to_numeric(col, errors="coerce").to_numpy(dtype="float64")
+
+
+def plan_styles(plan):
+    """Blue where a plan exists, grey where it is N/A."""
+    return np.where(np.isnan(plan), GREY, BLUE)
+
+
+def act_styles(act, target):
+    """Green when act reaches target, grey when nothing was produced, yellow otherwise.
+
+    Rows without a positive target are grey.
+    """
+    has_target = ~np.isnan(target) & (target > 0)
+    return np.select(
+        [has_target & (act >= target), has_target & (act == 0), has_target],
+        [GREEN, GREY, YELLOW],
+        default=GREY,
+    )
+
+
+def achievement_styles(ach):
+    conditions = [~np.isnan(ach) & (ach >= limit) for limit, _ in ACH_THRESHOLDS]
+    choices = [style for _, style in ACH_THRESHOLDS]
+    return np.where(np.isnan(ach), GREY, np.select(conditions, choices, default=RED))
+
+
+def wip_styles(df):
+    """Styles for the WIP grid (Production Area, Plan (Monthly), Plan (Day/Period), Act (Day/Period))."""
+    plan_column, act_column = df.columns[2], df.columns[3]
+    plan = _numeric(df[plan_column])
+    act = _numeric(df[act_column])
+    styles = pd.DataFrame("", index=df.index, columns=df.columns)
+    styles["Production Area"] = BOLD
+    styles["Plan (Monthly)"] = plan_styles(_numeric(df["Plan (Monthly)"]))
+    styles[plan_column] = plan_styles(plan)
+    # Act is judged against the phased daily plan for the days it covers
+    styles[act_column] = act_styles(act, plan)
+    return styles
+
+
+def daily_styles(df):
+    """Styles for the Daily Achievement table (Model, Area, Act, Plan, Achievement %)."""
+    plan = _numeric(df["Plan"])
+    act = _numeric(df["Act"])
+    styles = pd.DataFrame("", index=df.index, columns=df.columns)
+    styles["Model"] = BOLD
+    styles["Area"] = NEUTRAL
+    styles["Act"] = act_styles(act, plan)
+    styles["Plan"] = plan_styles(plan)
+    styles["Achievement %"] = achievement_styles(_numeric(df["Achievement %"]))
+    return styles
+
+
+def variance_styles(df):
+    """Red text for negative values, green otherwise (apply with subset=['Variance'])."""
+    styles = pd.DataFrame("", index=df.index, columns=df.columns)
+    for col in df.columns:
+        styles[col] = np.where(_numeric(df[col]) < 0, "color: red", "color: green")
+    return styles
+
+
+# Part coverage below this many days of planned demand is flagged
+COVERAGE_WARN_DAYS = 3
+
+
+def coverage_styles(df):
+    """Styles for the Part Coverage table: red when parts are short, yellow under COVERAGE_WARN_DAYS."""
+    days = _numeric(df["Coverage Days"])
+    styles = pd.DataFrame("", index=df.index, columns=df.columns)
+    styles["Part"] = BOLD
+    styles["Coverage Days"] = np.where(
+        np.isnan(days), GREY,
+        np.select([days < 0, days < COVERAGE_WARN_DAYS], [RED, YELLOW], default=GREEN),
+    )
+    return styles